@@ -0,0 +1,276 @@
+# utils
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shlex
+import subprocess
+import tempfile
+import warnings
+
+# I/O
+import wave
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# as in forced-alignment.sh
+DEFAULT_ALIGNER = "vrbs_align -f {wav} -o {xml} -leng -qs -v {transcript}"
+XML_END = ["</SegmentList>", "</AudioDoc>"]
+# words aligned at less than CUT_MARGIN seconds from a cut are suspicious (see check_cuts)
+CUT_MARGIN = 0.02
+
+
+def run_aligner(wav_path, xml_path, transcript_path, aligner=DEFAULT_ALIGNER):
+    """
+    Aligns audio and transcript using an external command (vrbs by default)
+
+    Parameters:
+    -----------
+    wav_path : path to the 16kHz wav file
+    xml_path : path where the aligner should write its XML output (see README)
+    transcript_path : path to the transcript with brackets around the speakers id
+        (see write_brackets)
+    aligner : `str`
+        command with {wav}, {xml} and {transcript} placeholders.
+        Defaults to DEFAULT_ALIGNER
+
+    Raises:
+    -------
+    subprocess.CalledProcessError if the aligner fails
+    """
+    command = aligner.format(wav=shlex.quote(str(wav_path)),
+                             xml=shlex.quote(str(xml_path)),
+                             transcript=shlex.quote(str(transcript_path)))
+    subprocess.run(shlex.split(command), check=True)
+
+
+def split_transcript(transcript, n_chunks):
+    """
+    Splits transcript in n_chunks at speaker turn boundaries,
+    so that the chunks have about the same number of characters
+
+    Parameters:
+    -----------
+    transcript : `str`
+        with one speaker turn per line (see write_brackets)
+    n_chunks : `int`
+
+    Returns:
+    --------
+    chunks : `list` of `str`
+        at most n_chunks, each of them starts with a speaker turn
+    positions : `list` of `float`
+        relative position (between 0.0 and 1.0) of the start of each chunk in transcript
+    """
+    turns = [turn + "\n" for turn in transcript.split("\n") if turn.strip()]
+    total = sum(len(turn) for turn in turns)
+    chunks, positions = [], []
+    n_characters = 0
+    for turn in turns:
+        if not chunks or n_characters >= total * len(chunks) / n_chunks:
+            chunks.append("")
+            positions.append(n_characters / total)
+        chunks[-1] += turn
+        n_characters += len(turn)
+    return chunks, positions
+
+
+def find_cuts(wav_path, positions, search=5.0, relative_search=0.05, window=0.1, silence=0.1):
+    """
+    Estimates where to cut the audio, given the relative positions of the chunks in the transcript,
+    assuming that speech is spread evenly over the characters of the transcript:
+    the cut is made in the silent window nearest to the same relative position in the audio,
+    at less than max(search, relative_search * duration of the file) seconds from it.
+    A window is silent if its energy is under min + silence * (median - min),
+    computed over the searched windows.
+
+    Parameters:
+    -----------
+    wav_path : path to the 16 bits wav file
+    positions : `list` of `float`
+        as returned by split_transcript
+    search : `float`, Optional.
+        Defaults to 5.0 seconds.
+    relative_search : `float`, Optional.
+        Defaults to 5% of the duration of the file
+        (e.g. to cope with opening credits, which aren't in the transcript).
+    window : `float`, Optional.
+        Duration of the windows of which the energy is compared.
+        Defaults to 0.1 seconds.
+    silence : `float`, Optional.
+        Defaults to 0.1
+
+    Returns:
+    --------
+    cuts : `list` of `int`
+        frame where each chunk starts (the first one is 0), then the number of frames of the file
+    """
+    with wave.open(str(wav_path), 'rb') as wav:
+        n_frames, framerate = wav.getnframes(), wav.getframerate()
+        n_channels, sample_width = wav.getnchannels(), wav.getsampwidth()
+        if sample_width != 2:
+            raise ValueError(f"{wav_path} should be encoded on 16 bits")
+        window_frames = max(int(window * framerate), 1)
+        radius = max(search, relative_search * n_frames / framerate) * framerate
+        cuts = [0]
+        for position in positions[1:]:
+            estimate = int(position * n_frames)
+            start = max(int(estimate - radius), cuts[-1] + 1)
+            end = min(int(estimate + radius), n_frames - 1)
+            if end - start < window_frames:
+                cuts.append(min(max(estimate, cuts[-1] + 1), n_frames - 1))
+                continue
+            wav.setpos(start)
+            samples = np.frombuffer(wav.readframes(end - start), dtype=np.int16)
+            samples = samples.reshape(-1, n_channels).astype(float).mean(axis=1)
+            n_windows = len(samples) // window_frames
+            energy = (samples[:n_windows * window_frames].reshape(n_windows, -1) ** 2).mean(axis=1)
+            centers = start + np.arange(n_windows) * window_frames + window_frames // 2
+            lowest = energy.min()
+            silent = np.flatnonzero(energy <= lowest + silence * (np.median(energy) - lowest))
+            cuts.append(int(centers[silent[np.argmin(np.abs(centers[silent] - estimate))]]))
+    return cuts + [n_frames]
+
+
+def write_wav_chunk(wav_path, chunk_path, start, end):
+    """Writes the frames of wav_path between start and end to chunk_path"""
+    with wave.open(str(wav_path), 'rb') as wav:
+        params = wav.getparams()
+        wav.setpos(start)
+        frames = wav.readframes(end - start)
+    with wave.open(str(chunk_path), 'wb') as chunk:
+        chunk.setparams(params)
+        chunk.writeframes(frames)
+
+
+def read_xml(xml_path):
+    """Parses the XML output of the aligner, closing it if needed (see write_id_aligned)"""
+    with open(xml_path, 'r') as file:
+        raw_xml = file.read().strip()
+    if raw_xml.split("\n")[-2:] != XML_END:
+        warnings.warn(f"{xml_path} didn't close it's xml properly")
+        raw_xml += "\n".join(XML_END)
+    return ET.fromstring(raw_xml)
+
+
+def stitch_xml(xml_roots, offsets):
+    """
+    Concatenates the speakers and speech segments of the XML outputs of the chunks (see README),
+    the time of the words and segments of each chunk is shifted by its offset.
+    Since the aligner numbers the speakers of each chunk independently,
+    their spkid is prefixed by the index of the chunk (e.g. 'MS1' of chunk 2 becomes '2_MS1').
+
+    Parameters:
+    -----------
+    xml_roots : `list`
+        roots of the xml trees of the chunks, root[3] should be SegmentList
+    offsets : `list` of `float`
+        start time of each chunk in the whole file, in seconds
+
+    Returns:
+    --------
+    xml_root : root of the xml tree of the whole file, based on xml_roots[0]
+    """
+    xml_root = xml_roots[0]
+    speaker_list, segment_list = xml_root[2], xml_root[3]
+    for i, (chunk_root, offset) in enumerate(zip(xml_roots, offsets)):
+        for element in list(chunk_root[2]) + list(chunk_root[3]):
+            if "spkid" in element.attrib:
+                element.attrib["spkid"] = f"{i}_{element.attrib['spkid']}"
+        if i > 0:
+            speaker_list.extend(list(chunk_root[2]))
+        for speech_segment in list(chunk_root[3]):
+            for element in [speech_segment] + list(speech_segment):
+                for attribute in ("stime", "etime"):
+                    if attribute in element.attrib:
+                        element.attrib[attribute] = f"{float(element.attrib[attribute]) + offset:.3f}"
+            if i > 0:
+                segment_list.append(speech_segment)
+    # so that the file ends with XML_END
+    if len(segment_list):
+        segment_list[-1].tail = "\n"
+    segment_list.tail = "\n"
+    return xml_root
+
+
+def check_cuts(xml_roots, durations, margin=CUT_MARGIN):
+    """
+    Since the cuts are only estimated (see find_cuts), checks that the words on each side of them
+    were aligned within their chunk and not against the cut,
+    which happens when the audio of a speaker turn ended up in the neighbouring chunk.
+
+    Parameters:
+    -----------
+    xml_roots : `list`
+        roots of the xml trees of the chunks (before stitch_xml), root[3] should be SegmentList
+    durations : `list` of `float`
+        duration of each chunk, in seconds
+    margin : `float`, Optional.
+        Defaults to CUT_MARGIN
+
+    Returns:
+    --------
+    suspicious : `list` of `int`
+        index of the suspicious cuts, i.e. of the chunk which starts there
+    """
+    bounds = []
+    for xml_root in xml_roots:
+        starts = [float(word.attrib["stime"]) for speech_segment in xml_root[3]
+                  for word in speech_segment]
+        ends = [float(word.attrib["stime"]) + float(word.attrib["dur"])
+                for speech_segment in xml_root[3] for word in speech_segment]
+        bounds.append((min(starts), max(ends)) if starts else None)
+    suspicious = []
+    for i in range(1, len(xml_roots)):
+        before, after = bounds[i - 1], bounds[i]
+        if before is None or after is None or before[1] > durations[i - 1] - margin \
+                or after[0] < margin:
+            suspicious.append(i)
+    return suspicious
+
+
+def align_chunked(wav_path, xml_path, transcript_path, aligner=DEFAULT_ALIGNER, n_chunks=1,
+                  n_workers=None):
+    """
+    Same as run_aligner but splits the file in n_chunks at speaker turn boundaries
+    (see split_transcript and find_cuts) which are aligned in parallel
+    then stitched back together (see stitch_xml).
+    If the words on each side of a cut don't leave a gap (see check_cuts),
+    the cut probably went through speech so the whole file is aligned with run_aligner instead.
+
+    Parameters:
+    -----------
+    wav_path, xml_path, transcript_path, aligner : see run_aligner
+    n_chunks : `int`, Optional.
+        Defaults to 1, i.e. same as run_aligner
+    n_workers : `int`, Optional.
+        Number of chunks aligned at once. Defaults to n_chunks
+    """
+    with open(transcript_path, 'r') as file:
+        chunks, positions = split_transcript(file.read(), n_chunks)
+    if len(chunks) <= 1:
+        return run_aligner(wav_path, xml_path, transcript_path, aligner)
+    cuts = find_cuts(wav_path, positions)
+    with wave.open(str(wav_path), 'rb') as wav:
+        framerate = wav.getframerate()
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(xml_path))) as tmp:
+        paths = []
+        for i, chunk in enumerate(chunks):
+            chunk_paths = [os.path.join(tmp, f"{i}{extension}")
+                           for extension in (".en16kHz.wav", ".xml", ".brackets")]
+            write_wav_chunk(wav_path, chunk_paths[0], cuts[i], cuts[i + 1])
+            with open(chunk_paths[2], 'w') as file:
+                file.write(chunk)
+            paths.append(chunk_paths)
+        with ThreadPoolExecutor(n_workers if n_workers else len(chunks)) as executor:
+            # list to raise the first error of the aligner, if any
+            list(executor.map(lambda chunk_paths: run_aligner(*chunk_paths, aligner), paths))
+        xml_roots = [read_xml(chunk_paths[1]) for chunk_paths in paths]
+    suspicious = check_cuts(xml_roots, [(end - start) / framerate
+                                        for start, end in zip(cuts[:-1], cuts[1:])])
+    if suspicious:
+        warnings.warn(f"words were aligned against the cuts at "
+                      f"{', '.join(f'{cuts[i] / framerate:.3f}' for i in suspicious)} "
+                      f"seconds of {wav_path}, aligning it as a whole")
+        return run_aligner(wav_path, xml_path, transcript_path, aligner)
+    xml_root = stitch_xml(xml_roots, [cut / framerate for cut in cuts[:-1]])
+    ET.ElementTree(xml_root).write(xml_path, encoding="unicode")
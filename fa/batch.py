@@ -0,0 +1,126 @@
+# utils
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os
+
+DONE = "done"
+SKIPPED = "skipped"
+
+
+def task(name, func, *args, deps=(), group=None, **kwargs):
+    """
+    Parameters:
+    -----------
+    name : `str`
+        unique identifier of the task
+    func : `callable`
+        picklable function which does the actual work, called as func(*args, **kwargs)
+    deps : `iterable` of `str`
+        names of the tasks which should be done before this one.
+        If any of them fails, this task is skipped.
+    group : `str`, Optional.
+        e.g. the serie uri, used to report failures.
+        Defaults to name.
+
+    Returns:
+    --------
+    task : `dict` to be passed to run_tasks
+    """
+    return {
+        "name": name,
+        "func": func,
+        "args": args,
+        "kwargs": kwargs,
+        "deps": list(deps),
+        "group": group if group is not None else name
+    }
+
+
+def _priorities(tasks):
+    """Number of tasks which (transitively) depend on each task"""
+    dependents = {name: set() for name in tasks}
+    for name, t in tasks.items():
+        for dep in t["deps"]:
+            dependents[dep].add(name)
+    descendants = {}
+
+    def visit(name):
+        if name not in descendants:
+            descendants[name] = set(dependents[name])
+            for dependent in dependents[name]:
+                descendants[name] |= visit(dependent)
+        return descendants[name]
+
+    return {name: len(visit(name)) for name in tasks}
+
+
+def run_tasks(tasks, n_workers=None):
+    """
+    Runs tasks over a single process pool, as soon as their dependencies are done.
+    Among the ready tasks, the ones with the most dependents are submitted first
+    so that long chains of tasks start early.
+    This is a greedy heuristic: the total duration is roughly at most
+    the total amount of work divided by n_workers plus the duration of the longest chain.
+
+    Parameters:
+    -----------
+    tasks : `list` of `dict`
+        as defined in task
+    n_workers : `int`, Optional.
+        Number of worker processes. Defaults to os.cpu_count()
+
+    Returns:
+    --------
+    status : `dict`
+        {name : DONE, SKIPPED or the exception raised by the task}
+    """
+    n_workers = n_workers if n_workers else os.cpu_count()
+    pending = {t["name"]: t for t in tasks}
+    if len(pending) != len(tasks):
+        raise ValueError("task names should be unique")
+    for t in tasks:
+        for dep in t["deps"]:
+            if dep not in pending:
+                raise ValueError(f"{t['name']} depends on {dep} which is not a task")
+    priorities = _priorities(pending)
+    status = {}
+    running = {}
+    with ProcessPoolExecutor(n_workers) as executor:
+        while pending or running:
+            # skip tasks which depend on a failed (or skipped) task
+            skipped = True
+            while skipped:
+                skipped = False
+                for name in list(pending):
+                    if any(status.get(dep, DONE) != DONE for dep in pending[name]["deps"]):
+                        status[name] = SKIPPED
+                        del pending[name]
+                        skipped = True
+            ready = [name for name, t in pending.items()
+                     if all(status.get(dep) == DONE for dep in t["deps"])]
+            ready.sort(key=lambda name: priorities[name], reverse=True)
+            for name in ready[:n_workers - len(running)]:
+                t = pending.pop(name)
+                running[executor.submit(t["func"], *t["args"], **t["kwargs"])] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                status[name] = DONE if error is None else error
+                print(f"[{len(status)}/{len(tasks)}] {name}: {status[name]}")
+    return status
+
+
+def failures(tasks, status):
+    """
+    Returns:
+    --------
+    failures : `dict`
+        {group : [names of the failed or skipped tasks of the group]}
+    """
+    failed = {}
+    for t in tasks:
+        if status.get(t["name"], SKIPPED) != DONE:
+            failed.setdefault(t["group"], []).append(t["name"])
+    return failed
@@ -88,6 +88,7 @@ def gecko_JSON_to_aligned(gecko_JSON, uri=None):
     -----------
     gecko_JSON : `dict`
         loaded from a Gecko-compliant JSON as defined in xml_to_GeckoJSON
+        or streamed using fa.stream.load_gecko_JSON
     uri (uniform resource identifier) : `str`
         which identifies the annotation (e.g. episode number)
         Defaults to None.
@@ -98,7 +99,14 @@ def gecko_JSON_to_aligned(gecko_JSON, uri=None):
         as defined in README one file per space-separated token.
         <file_uri> <speaker_id> <start_time> <end_time> <token> <confidence_score>
     """
-    aligned = ""
+    return "".join(gecko_JSON_to_aligned_lines(gecko_JSON, uri))
+
+
+def gecko_JSON_to_aligned_lines(gecko_JSON, uri=None):
+    """
+    Same as gecko_JSON_to_aligned but yields the lines one by one
+    so they can be written while streaming gecko_JSON.
+    """
     for monologue in gecko_JSON["monologues"]:
         if not monologue:
             continue
@@ -111,8 +119,7 @@ def gecko_JSON_to_aligned(gecko_JSON, uri=None):
             for speaker_id in speaker_ids:  # most of the time there's only one
                 if speaker_id == '' or term["text"].strip() == '':
                     continue
-                aligned += f'{uri} {speaker_id} {term["start"]:.2f} {term["end"]:.2f} {term["text"].strip()} {term.get("confidence", 0.0):.2f}\n'
-    return aligned
+                yield f'{uri} {speaker_id} {term["start"]:.2f} {term["end"]:.2f} {term["text"].strip()} {term.get("confidence", 0.0):.2f}\n'
 
 
 def gecko_JSON_to_UEM(gecko_JSON, uri=None, modality='speaker',
@@ -122,6 +129,7 @@ def gecko_JSON_to_UEM(gecko_JSON, uri=None, modality='speaker',
     -----------
     gecko_JSON : `dict`
         loaded from a Gecko-compliant JSON as defined in xml_to_GeckoJSON
+        or streamed using fa.stream.load_gecko_JSON
     uri (uniform resource identifier) : `str`
         which identifies the annotation (e.g. episode number)
         Default : None
@@ -136,6 +144,7 @@ def gecko_JSON_to_UEM(gecko_JSON, uri=None, modality='speaker',
     expected_min_speech_time: `float`, Optional.
         Threshold (in seconds) under which the total duration of speech time is suspicious (warns the user).
         Defaults to never suspect anything (i.e. 0.0)
+        Note that this crops the annotation, gecko_JSONs_to_RTTM relies on fa.stats instead.
 
     Returns:
     --------
@@ -172,9 +181,10 @@ def gecko_JSON_to_UEM(gecko_JSON, uri=None, modality='speaker',
                 last_confident = term["start"]
 
     annotation = annotation.support(collar)
-    total_speech_time = annotation.crop(annotated).get_timeline().duration()
-    if total_speech_time < expected_min_speech_time:
-        warnings.warn(f"total speech time of {uri} is only {total_speech_time})")
+    if expected_min_speech_time > 0.0:
+        total_speech_time = annotation.crop(annotated).get_timeline().duration()
+        if total_speech_time < expected_min_speech_time:
+            warnings.warn(f"total speech time of {uri} is only {total_speech_time})")
     return annotation, annotated.support()
 
 
@@ -186,6 +196,7 @@ def gecko_JSON_to_Annotation(gecko_JSON, uri=None, modality='speaker',
     -----------
     gecko_JSON : `dict`
         loaded from a Gecko-compliant JSON as defined in xml_to_GeckoJSON
+        or streamed using fa.stream.load_gecko_JSON
     uri (uniform resource identifier) : `str`
         which identifies the annotation (e.g. episode number)
         Default : None
@@ -200,6 +211,7 @@ def gecko_JSON_to_Annotation(gecko_JSON, uri=None, modality='speaker',
     expected_min_speech_time: `float`, Optional.
         Threshold (in seconds) under which the total duration of speech time is suspicious (warns the user).
         Defaults to never suspect anything (i.e. 0.0)
+        Note that this crops the annotation, gecko_JSONs_to_RTTM relies on fa.stats instead.
     manual : `bool`
         Whether the json is coming from a manual correction or straight from
         the forced-alignment output.
@@ -244,7 +256,8 @@ def gecko_JSON_to_Annotation(gecko_JSON, uri=None, modality='speaker',
     else:
         annotation = annotation.support(collar)
         annotated = not_annotated.gaps(support=Segment(0.0, term["end"]))
-    total_speech_time = annotation.crop(annotated).get_timeline().duration()
-    if total_speech_time < expected_min_speech_time:
-        warnings.warn(f"total speech time of {uri} is only {total_speech_time})")
+    if expected_min_speech_time > 0.0:
+        total_speech_time = annotation.crop(annotated).get_timeline().duration()
+        if total_speech_time < expected_min_speech_time:
+            warnings.warn(f"total speech time of {uri} is only {total_speech_time})")
     return annotation, annotated
@@ -0,0 +1,215 @@
+# utils
+from contextlib import contextmanager
+import os
+import socket
+import threading
+import time
+import traceback
+import warnings
+
+from fa.batch import DONE, SKIPPED
+from fa.utils import write_atomically
+
+# file extensions in lease_dir
+LEASE = ".lease"
+DONE_MARKER = ".done"
+FAILED_MARKER = ".failed"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}.{os.getpid()}"
+
+
+def _path(lease_dir, name, extension):
+    return os.path.join(lease_dir, name.replace("/", "%") + extension)
+
+
+def status(lease_dir, name):
+    """
+    Returns:
+    --------
+    DONE, the error message if the item failed, or None if it is not finished
+    """
+    if os.path.exists(_path(lease_dir, name, DONE_MARKER)):
+        return DONE
+    try:
+        with open(_path(lease_dir, name, FAILED_MARKER), 'r') as file:
+            return file.read() or SKIPPED
+    except FileNotFoundError:
+        return None
+
+
+def _mark(lease_dir, name, marker, content=""):
+    """Atomically writes the marker of name (written to a temporary file then renamed)"""
+    write_atomically(_path(lease_dir, name, marker), [content])
+
+
+def claim(lease_dir, name, worker_id, ttl):
+    """
+    Tries to take the lease of name.
+    The lease file is created with O_EXCL so only one worker can create it.
+    A lease which has not been renewed for more than ttl seconds is considered expired
+    (i.e. its worker died) and is reclaimed.
+
+    Returns:
+    --------
+    True if the lease was taken, False if it is held by another worker
+    """
+    path = _path(lease_dir, name, LEASE)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            expired = time.time() - os.stat(path).st_mtime > ttl
+        except FileNotFoundError:  # released in the meantime
+            return False
+        if not expired:
+            return False
+        # only one worker can move the expired lease away
+        stale_path = f"{path}.{worker_id}.expired"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return False
+        if time.time() - os.stat(stale_path).st_mtime <= ttl:
+            # the lease was reclaimed and renewed by another worker since we checked
+            try:
+                os.link(stale_path, path)
+            except FileExistsError:
+                pass
+            os.remove(stale_path)
+            return False
+        os.remove(stale_path)
+        warnings.warn(f"reclaiming expired lease of {name}")
+        return claim(lease_dir, name, worker_id, ttl)
+    with os.fdopen(fd, 'w') as file:
+        file.write(worker_id)
+    return True
+
+
+def owns(lease_dir, name, worker_id):
+    try:
+        with open(_path(lease_dir, name, LEASE), 'r') as file:
+            return file.read() == worker_id
+    except FileNotFoundError:
+        return False
+
+
+def release(lease_dir, name, worker_id):
+    if owns(lease_dir, name, worker_id):
+        os.remove(_path(lease_dir, name, LEASE))
+
+
+@contextmanager
+def hold(lease_dir, name, worker_id, ttl):
+    """Renews the lease of name every ttl/3 seconds while in the context, then releases it"""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(ttl / 3):
+            if not owns(lease_dir, name, worker_id):
+                warnings.warn(f"{worker_id} lost the lease of {name}")
+                return
+            os.utime(_path(lease_dir, name, LEASE))
+
+    heartbeat = threading.Thread(target=renew, daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+        release(lease_dir, name, worker_id)
+
+
+def clear_failed(lease_dir, names):
+    """Removes the .failed markers of names so that they are run again"""
+    for name in names:
+        try:
+            os.remove(_path(lease_dir, name, FAILED_MARKER))
+        except FileNotFoundError:
+            pass
+
+
+def _run(lease_dir, t, worker_id, ttl):
+    """Runs task t if its lease can be taken, returns True if it did"""
+    if not claim(lease_dir, t["name"], worker_id, ttl):
+        return False
+    with hold(lease_dir, t["name"], worker_id, ttl):
+        if status(lease_dir, t["name"]) is not None:  # finished before we took the lease
+            return False
+        print(f"{worker_id}: {t['name']}")
+        try:
+            t["func"](*t["args"], **t["kwargs"])
+        except Exception:
+            _mark(lease_dir, t["name"], FAILED_MARKER, traceback.format_exc())
+        else:
+            _mark(lease_dir, t["name"], DONE_MARKER)
+    return True
+
+
+def run_shard(lease_dir, tasks, merge=None, worker_id=None, ttl=600.0, poll=5.0,
+              retry=False):
+    """
+    Runs tasks (as defined in fa.batch.task) along with any number of other workers
+    (possibly on other machines) sharing lease_dir:
+    each task is run once, by the worker which took its lease.
+    Once every task is done, merge (a task as well) is run once.
+    Tasks which depend on a failed task, and merge if any task failed,
+    are marked as failed without being run.
+
+    Parameters:
+    -----------
+    lease_dir : path to a directory shared by all workers (e.g. on NFS)
+    tasks : `list` of `dict`
+        as defined in fa.batch.task
+    merge : `dict`, Optional.
+        as defined in fa.batch.task, its dependencies are ignored.
+    worker_id : `str`, Optional.
+        unique identifier of the worker. Defaults to <hostname>.<pid>
+    ttl : `float`, Optional.
+        Number of seconds after which the lease of a worker which stopped renewing it
+        is reclaimed. Should be large compared to the clock skew between machines.
+        Defaults to 600.0
+    poll : `float`, Optional.
+        Number of seconds to wait when all remaining tasks are held by other workers.
+        Defaults to 5.0
+    retry : `bool`, Optional.
+        Whether to run again the tasks (and merge) which failed or were skipped in a previous run.
+        Defaults to False
+
+    Returns:
+    --------
+    status : `dict`
+        {name : DONE, SKIPPED or the error message}
+    """
+    worker_id = worker_id if worker_id else default_worker_id()
+    os.makedirs(lease_dir, exist_ok=True)
+    names = [t["name"] for t in tasks] + ([merge["name"]] if merge is not None else [])
+    if retry:
+        clear_failed(lease_dir, names)
+    remaining = list(tasks)
+    while remaining:
+        progressed = False
+        for t in remaining:
+            if status(lease_dir, t["name"]) is not None:
+                continue
+            deps = [status(lease_dir, dep) for dep in t["deps"]]
+            if any(dep is None for dep in deps):
+                continue
+            if any(dep != DONE for dep in deps):
+                _mark(lease_dir, t["name"], FAILED_MARKER, SKIPPED)
+                progressed = True
+            else:
+                progressed |= _run(lease_dir, t, worker_id, ttl)
+        remaining = [t for t in remaining if status(lease_dir, t["name"]) is None]
+        if remaining and not progressed:
+            time.sleep(poll)
+    if merge is not None:
+        if any(status(lease_dir, t["name"]) != DONE for t in tasks):
+            if status(lease_dir, merge["name"]) is None:
+                _mark(lease_dir, merge["name"], FAILED_MARKER, SKIPPED)
+        while status(lease_dir, merge["name"]) is None:
+            if not _run(lease_dir, merge, worker_id, ttl):
+                time.sleep(poll)
+    return {name: status(lease_dir, name) for name in names}
@@ -0,0 +1,204 @@
+# I/O
+import mmap
+import os
+
+import numpy as np
+
+
+def _read(path, memory_map=False):
+    """Returns the content of path as `bytes` or, if memory_map, as a read-only `mmap.mmap`"""
+    with open(path, 'rb') as file:
+        if memory_map and os.fstat(file.fileno()).st_size > 0:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return file.read()
+
+
+def _select(data, prefixes):
+    """
+    Returns the lines of data which start with one of prefixes (all of data if prefixes is None)
+    as a single `bytes`.
+    Only the bytes between the first and the last matching line of each prefix are read
+    so the lines of the other files are not materialized if the files are contiguous
+    (as written by postprocess).
+    """
+    if prefixes is None:
+        return data[:]
+    blocks = []
+    for prefix in dict.fromkeys(prefixes):
+        if data[:len(prefix)] == prefix:
+            first = 0
+        else:
+            first = data.find(b'\n' + prefix)
+            if first < 0:
+                continue
+            first += 1
+        last = data.rfind(b'\n' + prefix)
+        last = first if last < 0 else last + 1
+        end = data.find(b'\n', last)
+        end = len(data) if end < 0 else end
+        block = data[first:end]
+        # some lines of other files are in between
+        if block.count(b'\n') != block.count(b'\n' + prefix):
+            block = b'\n'.join(line for line in block.split(b'\n') if line.startswith(prefix))
+        blocks.append(block)
+    return b'\n'.join(blocks)
+
+
+def _columns(text, n_fields=None):
+    """
+    Splits text at once in n_fields columns (`list` of `str`)
+    if every line seems to have the same number of whitespace-separated fields,
+    returns None otherwise (e.g. blank lines or tokens with spaces)
+    so that the caller falls back to parsing each line.
+    n_fields defaults to the number of fields of the first line.
+    """
+    text = text.strip()
+    if not text or '\n\n' in text:
+        return None
+    n_lines = text.count('\n') + 1
+    if n_fields is None:
+        n_fields = len(text.split('\n', 1)[0].split())
+    fields = text.split()
+    if len(fields) != n_lines * n_fields:
+        return None
+    return [fields[i::n_fields] for i in range(n_fields)]
+
+
+def _lines(text):
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def _floats(values):
+    return np.array(values, dtype=float) if len(values) else np.empty(0)
+
+
+def _intern(values):
+    """Returns the sorted table of unique values and the codes of values in this table"""
+    table = sorted(set(values))
+    index = {value: i for i, value in enumerate(table)}
+    return table, np.fromiter(map(index.__getitem__, values), dtype=int, count=len(values))
+
+
+def _parse_aligned(text):
+    """Returns the uri, speaker, start, end, token and confidence columns of text"""
+    columns = _columns(text, 6)
+    if columns is not None:
+        uri, speaker, start, end, token, confidence = columns
+        try:
+            return uri, speaker, _floats(start), _floats(end), token, _floats(confidence)
+        except ValueError:  # shifted fields, parsed line by line to report the error
+            pass
+    # tokens might contain spaces, the confidence is the last field
+    fields = [line.split(None, 4) for line in _lines(text)]
+    uri, speaker, start, end, rest = zip(*fields) if fields else ([],) * 5
+    token, confidence = zip(*(r.rsplit(None, 1) for r in rest)) if rest else ([],) * 2
+    return uri, speaker, _floats(start), _floats(end), token, _floats(confidence)
+
+
+def _parse_rttm(text):
+    """Returns the uri, speaker, start and duration columns of text"""
+    columns = _columns(text)
+    if columns is not None and len(columns) >= 8 and set(columns[0]) == {'SPEAKER'}:
+        try:
+            return columns[1], columns[7], _floats(columns[3]), _floats(columns[4])
+        except ValueError:
+            pass
+    fields = [line.split() for line in _lines(text)]
+    _, uri, _, start, duration, _, _, speaker = zip(*(f[:8] for f in fields)) \
+        if fields else ([],) * 8
+    return uri, speaker, _floats(start), _floats(duration)
+
+
+def load_aligned(path, uris=None, memory_map=False):
+    """
+    Loads a LIMSI-compliant 'aligned' file (as written by gecko_JSON_to_aligned) in columns
+
+    Parameters:
+    -----------
+    path : `str`
+        path to the aligned file, one line per token:
+        <file_uri> <speaker_id> <start_time> <end_time> <token> <confidence_score>
+    uris : `iterable` of `str`, Optional.
+        Only load the lines of these files. Defaults to load every line.
+    memory_map : `bool`, Optional.
+        Whether to memory-map the file instead of reading it, so that only the lines of uris are read.
+        This makes no difference without uris. Defaults to False.
+
+    Returns:
+    --------
+    aligned : `dict` of columns:
+        "uris" : `list` of `str`, the file uris
+        "uri" : `np.ndarray` of `int`, index of the file uri of each token in "uris"
+        "speakers" : `list` of `str`, the speaker ids
+        "speaker" : `np.ndarray` of `int`, index of the speaker of each token in "speakers"
+        "start", "end", "confidence" : `np.ndarray` of `float`
+        "token" : `np.ndarray` of `str`
+    """
+    data = _read(path, memory_map)
+    prefixes = None if uris is None else [uri.encode('utf-8') + b' ' for uri in uris]
+    block = _select(data, prefixes)
+    if isinstance(data, mmap.mmap):
+        data.close()
+    try:
+        uri, speaker, start, end, token, confidence = _parse_aligned(block.decode('utf-8'))
+    except ValueError as e:
+        raise ValueError(f"{path} is not a valid aligned file: {e}")
+    uri_table, uri_codes = _intern(uri)
+    speaker_table, speaker_codes = _intern(speaker)
+    return {
+        "uris": uri_table,
+        "uri": uri_codes,
+        "speakers": speaker_table,
+        "speaker": speaker_codes,
+        "start": start,
+        "end": end,
+        "token": np.array(token, dtype=str),
+        "confidence": confidence
+    }
+
+
+def load_rttm_arrays(path, uris=None, memory_map=False):
+    """
+    Loads a RTTM file (as written by pyannote `Annotation.write_rttm`) in columns,
+    without building pyannote objects (see pyannote.database.util.load_rttm).
+
+    Parameters:
+    -----------
+    path : `str`
+        path to the RTTM file, one line per segment:
+        SPEAKER <file_uri> 1 <start_time> <duration> <NA> <NA> <speaker_id> <NA> <NA>
+    uris : `iterable` of `str`, Optional.
+        Only load the lines of these files. Defaults to load every line.
+    memory_map : `bool`, Optional.
+        Whether to memory-map the file instead of reading it, so that only the lines of uris are read.
+        This makes no difference without uris. Defaults to False.
+
+    Returns:
+    --------
+    rttm : `dict` of columns:
+        "uris" : `list` of `str`, the file uris
+        "uri" : `np.ndarray` of `int`, index of the file uri of each segment in "uris"
+        "speakers" : `list` of `str`, the speaker ids
+        "speaker" : `np.ndarray` of `int`, index of the speaker of each segment in "speakers"
+        "start", "end" : `np.ndarray` of `float`
+    """
+    data = _read(path, memory_map)
+    prefixes = None if uris is None else [b'SPEAKER ' + uri.encode('utf-8') + b' '
+                                          for uri in uris]
+    block = _select(data, prefixes)
+    if isinstance(data, mmap.mmap):
+        data.close()
+    try:
+        uri, speaker, start, duration = _parse_rttm(block.decode('utf-8'))
+    except ValueError as e:
+        raise ValueError(f"{path} is not a valid RTTM file: {e}")
+    uri_table, uri_codes = _intern(uri)
+    speaker_table, speaker_codes = _intern(speaker)
+    return {
+        "uris": uri_table,
+        "uri": uri_codes,
+        "speakers": speaker_table,
+        "speaker": speaker_codes,
+        "start": start,
+        "end": start + duration
+    }
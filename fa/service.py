@@ -0,0 +1,229 @@
+# utils
+import io
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from fa.convert import gecko_JSON_to_Annotation, gecko_JSON_to_aligned
+from fa.stream import load_gecko_JSON
+from fa.utils import write_atomically
+
+DEFAULT_PORT = 8642
+# seconds to wait for other corrections before writing the files
+DEFAULT_DELAY = 0.5
+
+
+def _group_lines(path, field):
+    """
+    Returns:
+    --------
+    lines : `dict`
+        {uri : `str` with the lines of the uri}, in order of first appearance.
+        uri is the field-th space-separated field of the line
+    """
+    lines = {}
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            for line in file:
+                if line.strip():
+                    uri = line.split()[field]
+                    lines[uri] = lines.get(uri, "") + line
+    return lines
+
+
+def _check_uri(file_uri):
+    """Raises ValueError if file_uri can't be used as a file name (e.g. '../../escape')"""
+    if not file_uri or file_uri in {".", ".."} or "/" in file_uri or os.sep in file_uri \
+            or (os.altsep and os.altsep in file_uri):
+        raise ValueError(f"invalid file_uri '{file_uri}'")
+
+
+class ConversionService:
+    """
+    Keeps the RTTM and UEM of a serie (as written by postprocess) in memory, one block of lines per file,
+    and writes them back when they are updated from a manually corrected gecko JSON.
+    The files are written by a background thread DELAY seconds after the first update,
+    so that successive corrections are written at once.
+
+    Parameters:
+    -----------
+    rttm_path, uem_path : Outputs of postprocess
+    aligned_path : path where the <file_uri>.aligned files are stored, Optional.
+        Defaults to the directory of rttm_path
+    delay : `float`, Optional.
+        Defaults to DEFAULT_DELAY
+    """
+
+    def __init__(self, rttm_path, uem_path, aligned_path=None, delay=DEFAULT_DELAY):
+        self.rttm_path = rttm_path
+        self.uem_path = uem_path
+        self.aligned_path = aligned_path if aligned_path else os.path.dirname(
+            os.path.abspath(rttm_path))
+        self.delay = delay
+        # SPEAKER <file_uri> 1 <start> <duration> ...
+        self.rttm = _group_lines(rttm_path, 1)
+        # <file_uri> 1 <start> <end>
+        self.uem = _group_lines(uem_path, 0)
+        # {path : function returning the content to write}
+        self.dirty = {}
+        self.lock = threading.Lock()
+        # so that the files are written in the same order as their contents are computed
+        self.flushing = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+        self.flusher = threading.Thread(target=self._flush_forever, daemon=True)
+        self.flusher.start()
+
+    def _mark(self, path, content):
+        """Schedules the writing of path (holding the lock)"""
+        self.dirty[path] = content
+        self.updated.notify()
+
+    def _flush_forever(self):
+        while True:
+            with self.lock:
+                while not self.dirty:
+                    self.updated.wait()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every updated file now.
+        The files which couldn't be written are scheduled again (unless they were updated since).
+
+        Returns:
+        --------
+        written : `list` of the paths written
+        """
+        written = []
+        with self.flushing:
+            with self.lock:
+                dirty, self.dirty = self.dirty, {}
+                contents = {path: content() for path, content in dirty.items()}
+            for path, content in contents.items():
+                try:
+                    write_atomically(path, [content])
+                except Exception as e:
+                    print(f"couldn't write {path}, will retry: {type(e).__name__}: {e}")
+                    with self.lock:
+                        self.dirty.setdefault(path, dirty[path])
+                else:
+                    written.append(path)
+        return sorted(written)
+
+    def update_RTTM(self, gecko_JSON, file_uri):
+        """
+        Same as update_RTTM of forced-alignment.py
+
+        Raises:
+        -------
+        ValueError if file_uri is not in the RTTM
+        """
+        _check_uri(file_uri)
+        if file_uri not in self.rttm:
+            raise ValueError(f"{file_uri} is not in {self.rttm_path}")
+        annotation, annotated = gecko_JSON_to_Annotation(gecko_JSON, file_uri, 'speaker',
+                                                         manual=True)
+        rttm, uem = io.StringIO(), io.StringIO()
+        annotation.write_rttm(rttm)
+        annotated.write_uem(uem)
+        with self.lock:
+            self.rttm[file_uri] = rttm.getvalue()
+            self.uem[file_uri] = uem.getvalue()
+            self._mark(self.rttm_path, lambda: "".join(self.rttm.values()))
+            self._mark(self.uem_path, lambda: "".join(self.uem.values()))
+        return [self.rttm_path, self.uem_path]
+
+    def update_aligned(self, gecko_JSON, file_uri):
+        """Same as update_aligned of forced-alignment.py, writes <aligned_path>/<file_uri>.aligned"""
+        _check_uri(file_uri)
+        aligned = gecko_JSON_to_aligned(gecko_JSON, file_uri)
+        path = os.path.join(self.aligned_path, f"{file_uri}.aligned")
+        with self.lock:
+            self._mark(path, lambda: aligned)
+        return [path]
+
+    def write_RTTM(self, gecko_JSON, file_uri, directory=None):
+        """
+        Same as write_RTTM of forced-alignment.py,
+        writes <directory>/<file_uri>.manual.rttm and .manual.uem
+        directory defaults to aligned_path
+        """
+        _check_uri(file_uri)
+        directory = directory if directory else self.aligned_path
+        annotation, annotated = gecko_JSON_to_Annotation(gecko_JSON, file_uri, 'speaker',
+                                                         manual=True)
+        rttm, uem = io.StringIO(), io.StringIO()
+        annotation.write_rttm(rttm)
+        annotated.write_uem(uem)
+        paths = [os.path.join(directory, f"{file_uri}.manual.rttm"),
+                 os.path.join(directory, f"{file_uri}.manual.uem")]
+        with self.lock:
+            self._mark(paths[0], lambda: rttm.getvalue())
+            self._mark(paths[1], lambda: uem.getvalue())
+        return paths
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST /update_RTTM?file_uri=<file_uri>
+    POST /update_aligned?file_uri=<file_uri>
+    POST /write_RTTM?file_uri=<file_uri>
+        with the gecko JSON as body, or a json_path parameter
+    POST /flush
+    """
+    service = None
+
+    def _reply(self, code, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        command = url.path.strip("/")
+        parameters = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if command == "flush":
+                return self._reply(200, {"written": self.service.flush()})
+            if command not in {"update_RTTM", "update_aligned", "write_RTTM"}:
+                return self._reply(404, {"error": f"unknown command {command}"})
+            file_uri = parameters["file_uri"]
+            json_path = parameters.get("json_path")
+            if json_path:
+                gecko_JSON = load_gecko_JSON(json_path)
+            else:
+                gecko_JSON = json.loads(body)
+            if command == "write_RTTM":
+                directory = os.path.dirname(json_path) if json_path else None
+                paths = self.service.write_RTTM(gecko_JSON, file_uri, directory)
+            else:
+                paths = getattr(self.service, command)(gecko_JSON, file_uri)
+        except Exception as e:  # e.g. the body is valid JSON but not a gecko JSON
+            return self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+        self._reply(200, {"file_uri": file_uri, "pending": paths})
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+def serve(service, port=DEFAULT_PORT):
+    """Serves service on localhost:port until interrupted, then writes the pending updates"""
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    print(f"serving {service.rttm_path} and {service.uem_path} on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for path in service.flush():
+            print(f"succesfully dumped {path}")
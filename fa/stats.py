@@ -0,0 +1,207 @@
+# utils
+import re
+
+import numpy as np
+
+# Columns of the table written by write_stats, histogram columns are appended
+# (see histogram_columns)
+STATS_COLUMNS = ["uri", "speaker", "n_terms", "speech_time", "annotated_time",
+                 "annotated_speech_time", "overlap_time", "low_confidence",
+                 "unknown_share"]
+# speaker name used for the episode-level row
+EPISODE = "*"
+
+
+def collect_terms(gecko_JSON):
+    """
+    Wraps the monologues of gecko_JSON so that the terms are accumulated in columns
+    while the converters (e.g. gecko_JSON_to_Annotation) iterate over them.
+    This way the statistics do not need another pass over the JSON.
+
+    Parameters:
+    -----------
+    gecko_JSON : `dict`
+        loaded from a Gecko-compliant JSON as defined in xml_to_GeckoJSON
+
+    Returns:
+    --------
+    gecko_JSON : `dict`
+        a shallow copy of gecko_JSON, its monologues are consumed only once
+    columns : `dict`
+        filled as the monologues are consumed, to be passed to alignment_stats
+    """
+    columns = {
+        "start": [],
+        "end": [],
+        "confidence": [],
+        "unknown": [],
+        # one (term, speaker) pair per speaker of the term
+        "term": [],
+        "speaker": [],
+        "speakers": {}
+    }
+
+    def monologues():
+        for monologue in gecko_JSON["monologues"]:
+            if monologue:
+                # '@' defined in https://github.com/hbredin/pyannote-db-plumcot/blob/develop/CONTRIBUTING.md#idepisodetxt
+                # '+' defined in https://github.com/gong-io/gecko/blob/master/app/geckoModule/constants.js#L35
+                speaker_ids = [speaker_id for speaker_id in
+                               re.split("@|\+", monologue["speaker"]["id"])
+                               if speaker_id != '']  # happens with "all@"
+                speakers = [columns["speakers"].setdefault(speaker_id,
+                                                           len(columns["speakers"]))
+                            for speaker_id in speaker_ids]
+                unknown = any('#unknown#' in speaker_id for speaker_id in speaker_ids)
+                for term in monologue["terms"]:
+                    i = len(columns["start"])
+                    columns["start"].append(float(term["start"]))
+                    columns["end"].append(float(term["end"]))
+                    columns["confidence"].append(float(term.get("confidence", 0.)))
+                    columns["unknown"].append(unknown)
+                    columns["term"].extend(i for _ in speakers)
+                    columns["speaker"].extend(speakers)
+            yield monologue
+
+    return dict(gecko_JSON, monologues=monologues()), columns
+
+
+def histogram_columns(bins=10):
+    """Names of the confidence histogram columns, e.g. 'conf_0.0-0.1'"""
+    edges = np.linspace(0., 1., bins + 1)
+    return [f"conf_{low:.1f}-{high:.1f}" for low, high in zip(edges[:-1], edges[1:])]
+
+
+def _coverage(boundaries, start, end, group=None, n_groups=1):
+    """
+    Number of intervals covering each elementary segment [boundaries[i], boundaries[i+1]].
+    If group is provided, the coverage is computed per group, shape (n_groups, len(boundaries)-1)
+    """
+    if group is None:
+        group = np.zeros(len(start), dtype=int)
+    diff = np.zeros((n_groups, len(boundaries)), dtype=int)
+    np.add.at(diff, (group, np.searchsorted(boundaries, start)), 1)
+    np.add.at(diff, (group, np.searchsorted(boundaries, end)), -1)
+    return np.cumsum(diff, axis=1)[:, :-1]
+
+
+def _support(start, end, group, collar=0.0):
+    """
+    Merges the intervals of the same group separated by less than collar,
+    like pyannote `Annotation.support`
+
+    Returns:
+    --------
+    start, end, group : `np.ndarray` of the merged intervals
+    """
+    if not len(start):
+        return start, end, group
+    order = np.lexsort((start, group))
+    start, end, group = start[order], end[order], group[order]
+    # shift each group after the previous one so that the running maximum doesn't cross groups
+    shift = group * (end.max() - start.min() + collar + 1.)
+    last_end = np.maximum.accumulate(end + shift) - shift
+    new = np.ones(len(start), dtype=bool)
+    new[1:] = (group[1:] != group[:-1]) | (start[1:] - last_end[:-1] >= collar)
+    first = np.flatnonzero(new)
+    return start[first], np.maximum.reduceat(end, first), group[first]
+
+
+def alignment_stats(columns, uri=None, annotated=None, low_confidence=0.5, bins=10,
+                    collar=0.0):
+    """
+    Computes alignment quality metrics of an episode, as a whole and per speaker.
+
+    Parameters:
+    -----------
+    columns : `dict`
+        as returned by collect_terms, after the monologues have been consumed
+    uri (uniform resource identifier) : `str`
+        which identifies the annotation (e.g. episode number)
+        Defaults to None.
+    annotated: pyannote `Timeline`, Optional.
+        representing the annotated parts of the file.
+        Defaults to considering that nothing is annotated.
+    low_confidence : `float`, Optional.
+        Terms with a confidence under (or equal to) low_confidence are counted as low-confidence
+        Defaults to 0.5
+    bins : `int`, Optional.
+        Number of bins of the confidence histogram (between 0.0 and 1.0)
+        Defaults to 10
+    collar: `float`, Optional.
+        Merge the speech turns of the same speaker separated by less than `collar` seconds,
+        as gecko_JSON_to_Annotation does. Defaults to 0.0
+
+    Returns:
+    --------
+    rows : `list` of `dict`
+        The first row holds the episode statistics (speaker is EPISODE),
+        the next ones the statistics of each speaker.
+        Keys are STATS_COLUMNS + histogram_columns(bins).
+        Times are in seconds and computed from the term boundaries, after applying collar.
+    """
+    start = np.array(columns["start"], dtype=float)
+    end = np.array(columns["end"], dtype=float)
+    confidence = np.array(columns["confidence"], dtype=float)
+    unknown = np.array(columns["unknown"], dtype=bool)
+    term = np.array(columns["term"], dtype=int)
+    speaker = np.array(columns["speaker"], dtype=int)
+    speakers = list(columns["speakers"])
+    if annotated is None:
+        annotated_start = annotated_end = np.empty(0)
+    else:
+        annotated_start = np.array([segment.start for segment in annotated], dtype=float)
+        annotated_end = np.array([segment.end for segment in annotated], dtype=float)
+
+    boundaries = np.unique(np.concatenate((start, end, annotated_start, annotated_end)))
+    widths = np.diff(boundaries)
+    # active[s, i] is True if speaker s speaks during the i-th elementary segment
+    turn_start, turn_end, turn_speaker = _support(start[term], end[term], speaker, collar)
+    active = _coverage(boundaries, turn_start, turn_end, turn_speaker, len(speakers)) > 0
+    n_active = active.sum(axis=0)
+    is_annotated = _coverage(boundaries, annotated_start, annotated_end)[0] > 0
+    annotated_time = widths[is_annotated].sum()
+    histogram_names = histogram_columns(bins)
+
+    def row(name, mask, speech, overlap, unknown_share):
+        histogram, _ = np.histogram(confidence[mask], bins=bins, range=(0., 1.))
+        n_terms = int(mask.sum())
+        values = [uri, name, n_terms,
+                  widths[speech].sum(),
+                  annotated_time,
+                  widths[speech & is_annotated].sum(),
+                  widths[overlap].sum(),
+                  (confidence[mask] <= low_confidence).sum() / n_terms if n_terms else 0.,
+                  unknown_share]
+        values += (histogram / n_terms if n_terms else histogram).tolist()
+        return dict(zip(STATS_COLUMNS + histogram_names, values))
+
+    rows = [row(EPISODE, np.ones(len(start), dtype=bool), n_active > 0, n_active > 1,
+                unknown.mean() if len(unknown) else 0.)]
+    for s, name in enumerate(speakers):
+        mask = np.zeros(len(start), dtype=bool)
+        mask[term[speaker == s]] = True
+        rows.append(row(name, mask, active[s], active[s] & (n_active > 1),
+                        float('#unknown#' in name)))
+    return rows
+
+
+def write_stats(rows, file, header=True):
+    """
+    Writes rows (as returned by alignment_stats) to file as tab-separated values
+
+    Parameters:
+    -----------
+    rows : `list` of `dict`
+    file : `TextIO`
+    header : `bool`
+        whether to write the column names first. Defaults to True.
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+    if header:
+        file.write("\t".join(columns) + "\n")
+    for row in rows:
+        file.write("\t".join(f"{row[column]:.3f}" if isinstance(row[column], float)
+                             else str(row[column]) for column in columns) + "\n")
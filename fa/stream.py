@@ -0,0 +1,132 @@
+# I/O
+import json
+
+# number of characters read at once
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Characters of a file which have been read but not parsed yet"""
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def read(self):
+        """Drops the parsed characters and reads at least as many characters as are buffered"""
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        chunk = self.file.read(max(self.chunk_size, len(self.text)))
+        self.eof = not chunk
+        self.text += chunk
+
+    def peek(self):
+        """Skips whitespace and returns the next character ('' at the end of the file)"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or self.eof:
+                return self.text[self.pos:self.pos + 1]
+            self.read()
+
+    def expect(self, characters):
+        """Consumes the next character which should be in characters"""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"expected one of '{characters}' but got '{character}' "
+                             f"in {self.file.name}")
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Parses the next JSON value (reading more characters until it is complete)"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # a number might continue in the next chunk
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            self.read()
+
+
+def iter_monologues(path, chunk_size=CHUNK_SIZE):
+    """
+    Parses a Gecko-compliant JSON file incrementally,
+    so that only one monologue is in memory at once.
+
+    Parameters:
+    -----------
+    path : path to a Gecko-compliant JSON as defined in xml_to_GeckoJSON
+    chunk_size : `int`, Optional.
+        Number of characters read at once. Defaults to CHUNK_SIZE
+
+    Yields:
+    -------
+    monologue : `dict`
+        e.g. {"speaker": {"id": "sheldon_cooper", ...}, "terms": [...]}
+    """
+    with open(path, 'r') as file:
+        buffer = _Buffer(file, chunk_size)
+        buffer.expect("{")
+        if buffer.peek() == "}":
+            return
+        while True:
+            key = buffer.value()
+            buffer.expect(":")
+            if key == "monologues":
+                buffer.expect("[")
+                if buffer.peek() == "]":
+                    buffer.pos += 1
+                else:
+                    while True:
+                        yield buffer.value()
+                        if buffer.expect(",]") == "]":
+                            break
+            else:
+                buffer.value()  # e.g. schemaVersion
+            if buffer.expect(",}") == "}":
+                return
+
+
+def iter_terms(path, chunk_size=CHUNK_SIZE):
+    """
+    Same as iter_monologues but yields every term along with the speaker of its monologue
+
+    Yields:
+    -------
+    speaker : `dict`
+        e.g. {"id": "sheldon_cooper", ...}
+    term : `dict`
+        e.g. {"start": 0.0, "end": 0.5, "text": "How", "confidence": 0.9, ...}
+    """
+    for monologue in iter_monologues(path, chunk_size):
+        if not monologue:
+            continue
+        for term in monologue["terms"]:
+            yield monologue["speaker"], term
+
+
+def load_gecko_JSON(path, chunk_size=CHUNK_SIZE):
+    """
+    Lazy alternative to json.load:
+    the file is parsed while iterating over gecko_JSON["monologues"], which can be done only once.
+    It can be passed to the gecko_JSON_to_* converters of fa.convert.
+
+    Returns:
+    --------
+    gecko_JSON : `dict`
+        {"monologues": iter_monologues(path, chunk_size)}
+    """
+    return {"monologues": iter_monologues(path, chunk_size)}
@@ -1,3 +1,10 @@
+# utils
+import os
+import re
+import socket
+import threading
+
+
 def normalize_string(string):
     """
     Lowercases and removes punctuation from input string, also strips the spaces from the borders and removes multiple spaces
@@ -30,3 +37,25 @@ def do_this(display="", defaults_to_yes=True):
             return True
         else:
             return False
+
+
+def write_atomically(path, lines):
+    """
+    Writes lines to a temporary file then renames it to path,
+    so that path is never half-written and is left untouched if lines raises
+    (e.g. while streaming a truncated gecko JSON)
+
+    Parameters:
+    -----------
+    path : path of the file to write
+    lines : `iterable` of `str`
+    """
+    tmp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as file:
+            file.writelines(lines)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
@@ -13,6 +13,10 @@ Usage:
     forced-alignment.py update_aligned <aligned_path> <json_path> <file_uri>
     forced-alignment.py gecko_to_aligned <aligned_path>
     forced-alignment.py write_RTTM <json_path> <file_uri>
+    forced-alignment.py batch <series_path> <plumcot_path> [options]
+    forced-alignment.py shard <serie_uri> <plumcot_path> <serie_split> [--wav_path=<wav_path> --aligned_path=<aligned_path>] [options]
+    forced-alignment.py align <serie_uri> <plumcot_path> <file_uri> [--wav_path=<wav_path> --aligned_path=<aligned_path>] [options]
+    forced-alignment.py serve <rttm_path> <uem_path> [--aligned_path=<aligned_path>] [options]
     forced-alignment.py -h | --help
 
 Arguments:
@@ -30,6 +34,9 @@ Arguments:
     <json_path>                             Path to the manually corrected, gecko-compliant json
     <file_uri>                              uri of the file you corrected (should be in the RTTM file)
     <aligned_path>                          Output of postprocess
+    <series_path>                           List of series to process, one per line
+                                            (only the first comma-separated field is used)
+                                            e.g. /path/to/pyannote-db-plumcot/Plumcot/data/series.txt
 
 Common options:
     --aligned_path=<aligned_path>           Defaults to <plumcot_path>/Plumcot/data/<serie_uri>/forced-alignment
@@ -43,7 +50,7 @@ postprocess options:
     --transcripts_path=<transcripts_path>   Defaults to <plumcot_path>/Plumcot/data/<serie_uri>/transcripts
     --expected_time=<expected_time>         `float`, Optional.
                                             Threshold (in seconds) under which the total duration of speech time
-                                            is suspicious (warns the user).
+                                            (after applying --collar) in the UEM is suspicious (warns the user).
                                             Defaults to never suspect anything (i.e. 0.0)
                                             Recommended : 200.0
     --conf_threshold=<conf_threshold>       `float`, the segments with confidence under `conf_threshold`
@@ -58,6 +65,46 @@ split_regions options:
     <file_path>                             Absolute path to the gecko-json file you want to preprocess
     --threshold                             Duration of the silence (s) between two words so the region is split
                                             Defaults to 0.15 seconds.
+
+batch options:
+    --stages=<stages>                       Comma-separated stages to run for every serie among
+                                            preprocess, postprocess and clean_UEM.
+                                            Defaults to postprocess
+    --splits=<splits_path>                  File with one '<serie_uri> <serie_split>' per line.
+                                            Series without <serie_split> are not converted to RTTM.
+    --workers=<workers>                     `int`, Number of processes shared by all series.
+                                            Defaults to the number of CPUs
+
+shard options:
+    --lease_dir=<lease_dir>                 Directory shared by all workers.
+                                            Defaults to <aligned_path>/leases
+    --ttl=<ttl>                             `float`, Number of seconds after which the lease of a dead worker
+                                            is reclaimed. Defaults to 600.0
+    --worker_id=<worker_id>                 Defaults to <hostname>.<pid>
+    --retry                                 Run again the tasks which failed in a previous run.
+                                            Note that --aligner and --chunks (defaults to 1) also apply.
+
+align options:
+    --aligner=<aligner>                     Command with {wav}, {xml} and {transcript} placeholders.
+                                            Defaults to "vrbs_align -f {wav} -o {xml} -leng -qs -v {transcript}"
+    --chunks=<chunks>                       `int`, Number of chunks in which the file is split at speaker turns,
+                                            aligned in parallel, then stitched back together.
+                                            Defaults to 1, i.e. the file is aligned as a whole.
+                                            Note that the cuts are estimated from the transcript length
+                                            and the audio energy, not from the alignment: a cut made
+                                            in a pause of the wrong speaker turn isn't detected
+                                            and silently misaligns the words around it.
+                                            Note that --workers is the number of chunks aligned at once
+                                            (defaults to <chunks>) and that --wav_path defaults to
+                                            /vol/work3/lefevre/dvd_extracted
+
+serve options:
+    --port=<port>                           `int`, the service listens on http://127.0.0.1:<port>
+                                            Defaults to 8642
+    --delay=<delay>                         `float`, Number of seconds to wait for other corrections
+                                            before writing the files. Defaults to 0.5
+                                            Note that --aligned_path is where the <file_uri>.aligned files are written,
+                                            it defaults to the directory of <rttm_path>.
 """
 
 # # Dependencies
@@ -69,6 +116,7 @@ import json
 import xml.etree.ElementTree as ET
 import re
 import os
+import sys
 from pathlib import Path
 
 # Meta
@@ -76,9 +124,14 @@ from typing import TextIO, Union
 import warnings
 
 # utils
-from fa.utils import normalize_string, do_this
-from fa.convert import gecko_JSON_to_UEM
+from fa.utils import normalize_string, do_this, write_atomically
+from fa.batch import task, run_tasks, failures, DONE
+from fa.lease import run_shard
+from fa.align import align_chunked, read_xml, DEFAULT_ALIGNER
 from fa.convert import *
+from fa.stats import collect_terms, alignment_stats, write_stats
+from fa.stream import load_gecko_JSON
+from fa.service import ConversionService, serve, DEFAULT_PORT, DEFAULT_DELAY
 
 # pyannote
 from pyannote.core import Annotation, Segment, Timeline, notebook, SlidingWindowFeature, \
@@ -130,7 +183,34 @@ def write_brackets(SERIE_PATH, TRANSCRIPTS_PATH):
     print("\nsuccesfully wrote file list to", os.path.join(SERIE_PATH, "file_list.txt"))
 
 
-XML_END = ["</SegmentList>", "</AudioDoc>"]
+# stages which can be run by batch, in order
+BATCH_STAGES = ["preprocess", "postprocess", "clean_UEM"]
+
+
+def write_id_aligned_file(ALIGNED_PATH, TRANSCRIPTS_PATH, file_uri):
+    """
+    writes the json file of file_uri as defined in functions xml_to_GeckoJSON and aligned_to_id
+
+    Returns:
+    --------
+    True if the json file was written, False if the xml couldn't be parsed
+    """
+    file_name = file_uri + ".xml"
+    with open(os.path.join(TRANSCRIPTS_PATH, file_uri + ".txt"), "r") as file:
+        raw_script = file.read()
+    try:
+        xml_root = read_xml(os.path.join(ALIGNED_PATH, file_name))
+    except ET.ParseError as e:
+        warnings.warn(
+            f"\nxml.etree.ElementTree.ParseError: {e} "
+            f"\nThis happened with {file_name}, skipping to next file"
+        )
+        return False
+    gecko_json = xml_to_GeckoJSON(xml_root, raw_script)
+    json_path = os.path.join(ALIGNED_PATH, file_uri + ".json")
+    with open(json_path, "w") as file:
+        json.dump(gecko_json, file, indent=4)
+    return True
 
 
 def write_id_aligned(ALIGNED_PATH, TRANSCRIPTS_PATH):
@@ -142,35 +222,25 @@ def write_id_aligned(ALIGNED_PATH, TRANSCRIPTS_PATH):
         file_uri, extension = os.path.splitext(
             file_name)  # file_uri should be common to xml and txt file
         if extension == ".xml":
-            with open(os.path.join(TRANSCRIPTS_PATH, file_uri + ".txt"), "r") as file:
-                raw_script = file.read()
-            with open(os.path.join(ALIGNED_PATH, file_name), "r") as file:
-                raw_xml = file.read()
-                raw_xml = raw_xml.strip()
-                if raw_xml.split("\n")[-2:] != XML_END:
-                    warnings.warn(f"{file_name} didn't close it's xml properly")
-                    # print(raw_xml.split("\n")[-2:],XML_END)
-                    raw_xml += "\n".join(XML_END)
-            try:
-                xml_tree = ET.ElementTree(ET.fromstring(raw_xml))
-            except ET.ParseError as e:
-                warnings.warn(
-                    f"\nxml.etree.ElementTree.ParseError: {e} "
-                    f"\nThis happened with {file_name}, skipping to next file"
-                )
+            if not write_id_aligned_file(ALIGNED_PATH, TRANSCRIPTS_PATH, file_uri):
                 continue
-            xml_root = xml_tree.getroot()
-            gecko_json = xml_to_GeckoJSON(xml_root, raw_script)
             json_path = os.path.join(ALIGNED_PATH, file_uri + ".json")
-            print("\rWriting file #{} to {}".format(file_counter, json_path), end="")
+            print("\rWrote file #{} to {}".format(file_counter, json_path), end="")
             file_counter += 1
-            with open(json_path, "w") as file:
-                json.dump(gecko_json, file, indent=4)
     if file_counter == 0:
         raise ValueError(f"no xml files were found in {ALIGNED_PATH}")
     print()  # new line for prettier print
 
 
+def gecko_JSON_to_aligned_file(ALIGNED_PATH, uri):
+    """
+    writes ALIGNED_PATH/<uri>.aligned from ALIGNED_PATH/<uri>.json
+    """
+    gecko_JSON = load_gecko_JSON(os.path.join(ALIGNED_PATH, uri + ".json"))
+    write_atomically(os.path.join(ALIGNED_PATH, uri + ".aligned"),
+                gecko_JSON_to_aligned_lines(gecko_JSON, uri))
+
+
 def gecko_JSONs_to_aligned(ALIGNED_PATH):
     file_counter = 0
     for i, file_name in enumerate(sorted(os.listdir(ALIGNED_PATH))):
@@ -181,11 +251,7 @@ def gecko_JSONs_to_aligned(ALIGNED_PATH):
                                                          os.path.join(ALIGNED_PATH,
                                                                       file_name)), end="")
             file_counter += 1
-            with open(os.path.join(ALIGNED_PATH, file_name), "r") as file:
-                gecko_JSON = json.load(file)
-            aligned = gecko_JSON_to_aligned(gecko_JSON, uri)
-            with open(os.path.join(ALIGNED_PATH, uri + ".aligned"), 'w') as file:
-                file.write(aligned)
+            gecko_JSON_to_aligned_file(ALIGNED_PATH, uri)
     if file_counter == 0:
         raise ValueError(f"no json files were found in {ALIGNED_PATH}")
     print("\ndone ;)")
@@ -214,8 +280,7 @@ def gecko_JSONs_to_UEM(ALIGNED_PATH, ANNOTATED_PATH, VRBS_CONFIDENCE_THRESHOLD=0
                                                          os.path.join(ALIGNED_PATH,
                                                                       file_name)), end="")
             # read file, convert to annotation and write rttm
-            with open(os.path.join(ALIGNED_PATH, file_name), "r") as file:
-                gecko_JSON = json.load(file)
+            gecko_JSON = load_gecko_JSON(os.path.join(ALIGNED_PATH, file_name))
             annotation, annotated = gecko_JSON_to_UEM(gecko_JSON, uri, 'speaker',
                                                       VRBS_CONFIDENCE_THRESHOLD)
             with open(ANNOTATED_PATH, 'a') as file:
@@ -228,11 +293,12 @@ def gecko_JSONs_to_UEM(ALIGNED_PATH, ANNOTATED_PATH, VRBS_CONFIDENCE_THRESHOLD=0
 
 def gecko_JSONs_to_RTTM(ALIGNED_PATH, ANNOTATION_PATH, ANNOTATED_PATH, serie_split,
                         VRBS_CONFIDENCE_THRESHOLD=0.0, FORCED_ALIGNMENT_COLLAR=0.0,
-                        expected_min_speech_time=0.0):
+                        expected_min_speech_time=0.0, STATS_PATH=None, SERIE_PATH=None):
     """
     Converts gecko_JSON files to RTTM using pyannote `Annotation`.
     Also keeps a track of files in train, dev and test sets.
     Also adds annotated parts of the files to a UEM depending on VRBS_CONFIDENCE_THRESHOLD.
+    Also computes alignment quality metrics of every file and speaker (see fa.stats).
 
     Parameters:
     -----------
@@ -243,7 +309,16 @@ def gecko_JSONs_to_RTTM(ALIGNED_PATH, ANNOTATION_PATH, ANNOTATED_PATH, serie_spl
         Defaults to 0.0
     FORCED_ALIGNMENT_COLLAR: `float`, Merge tracks with same label and separated by less than `FORCED_ALIGNMENT_COLLAR` seconds.
         Defaults to 0.0
+    expected_min_speech_time: `float`, Threshold (in seconds) under which the annotated speech time
+        of a file (i.e. speech, after applying FORCED_ALIGNMENT_COLLAR, in the UEM) is suspicious
+        (warns the user). Defaults to 0.0
+    STATS_PATH : path where to store the alignment quality metrics as tab-separated values.
+        Defaults to not writing them.
+    SERIE_PATH : path where to store the lists of files in train, dev and test sets.
+        Defaults to the parent directory of ALIGNED_PATH.
     """
+    if SERIE_PATH is None:
+        SERIE_PATH = os.path.dirname(os.path.abspath(ALIGNED_PATH))
     if os.path.exists(ANNOTATION_PATH):
         raise ValueError("""{} already exists.
                          You probably don't wan't to append any more data to it.
@@ -252,6 +327,9 @@ def gecko_JSONs_to_RTTM(ALIGNED_PATH, ANNOTATION_PATH, ANNOTATED_PATH, serie_spl
         raise ValueError("""{} already exists.
                          You probably don't wan't to append any more data to it.
                          If you do, remove this if statement.""".format(ANNOTATED_PATH))
+    if STATS_PATH and os.path.exists(STATS_PATH):
+        raise ValueError(f"""{STATS_PATH} already exists.
+                         You probably don't wan't to append any more data to it.""")
     file_counter = 0
     train_list, dev_list, test_list = [], [], []  # keep track of file name used for train, dev and test sets
     for i, file_name in enumerate(sorted(os.listdir(ALIGNED_PATH))):
@@ -262,17 +340,23 @@ def gecko_JSONs_to_RTTM(ALIGNED_PATH, ANNOTATION_PATH, ANNOTATED_PATH, serie_spl
                                                          os.path.join(ALIGNED_PATH,
                                                                       file_name)), end="")
             # read file, convert to annotation and write rttm
-            with open(os.path.join(ALIGNED_PATH, file_name), "r") as file:
-                gecko_JSON = json.load(file)
+            gecko_JSON = load_gecko_JSON(os.path.join(ALIGNED_PATH, file_name))
+            gecko_JSON, columns = collect_terms(gecko_JSON)
             annotation, annotated = gecko_JSON_to_Annotation(gecko_JSON, uri, 'speaker',
                                                              VRBS_CONFIDENCE_THRESHOLD,
                                                              FORCED_ALIGNMENT_COLLAR,
-                                                             expected_min_speech_time,
                                                              manual=False)
+            stats = alignment_stats(columns, uri, annotated, collar=FORCED_ALIGNMENT_COLLAR)
+            if stats[0]["annotated_speech_time"] < expected_min_speech_time:
+                warnings.warn(f"total speech time of {uri} is only "
+                              f"{stats[0]['annotated_speech_time']})")
             with open(ANNOTATION_PATH, 'a') as file:
                 annotation.write_rttm(file)
             with open(ANNOTATED_PATH, 'a') as file:
                 annotated.write_uem(file)
+            if STATS_PATH:
+                with open(STATS_PATH, 'a') as file:
+                    write_stats(stats, file, header=file_counter == 0)
             # train dev or test ?
             season_number = int(re.findall(r'\d+', file_name.split(".")[1])[0])
             if season_number in serie_split["test"]:
@@ -292,6 +376,8 @@ def gecko_JSONs_to_RTTM(ALIGNED_PATH, ANNOTATION_PATH, ANNOTATED_PATH, serie_spl
         file.write("\n".join(test_list))
     print("\nDone, succefully wrote the rttm file to {}\n and the uem file to {}".format(
         ANNOTATION_PATH, ANNOTATED_PATH))
+    if STATS_PATH:
+        print(f"and the alignment statistics to {STATS_PATH}")
 
 
 def check_files(SERIE_PATH, wav_path, aligned_path):
@@ -383,8 +469,7 @@ def update_RTTM(rttm_path, uem_path, json_path, file_uri):
     print("loading UEM...")
     uem = load_uem(uem_path)
 
-    with open(json_path, 'r') as file:
-        gecko_JSON = json.load(file)
+    gecko_JSON = load_gecko_JSON(json_path)
     annotation, annotated = gecko_JSON_to_Annotation(gecko_JSON, file_uri, 'speaker',
                                                      manual=True)
     rttm[file_uri] = annotation
@@ -403,8 +488,7 @@ def update_RTTM(rttm_path, uem_path, json_path, file_uri):
 def write_RTTM(json_path, file_uri):
     rttm_path = Path(json_path.parent, f"{file_uri}.manual.rttm")
     uem_path = Path(json_path.parent, f"{file_uri}.manual.uem")
-    with open(json_path, 'r') as file:
-        gecko_JSON = json.load(file)
+    gecko_JSON = load_gecko_JSON(json_path)
     annotation, annotated = gecko_JSON_to_Annotation(gecko_JSON, file_uri, 'speaker',
                                                      manual=True)
     with open(rttm_path, 'w') as file:
@@ -417,14 +501,181 @@ def write_RTTM(json_path, file_uri):
 def update_aligned(aligned_path, json_path, file_uri):
     if file_uri not in json_path:
         warnings.warn(f"replacing {aligned_path} by {json_path}")
-    with open(json_path, 'r') as file:
-        gecko_JSON = json.load(file)
-    aligned = gecko_JSON_to_aligned(gecko_JSON, file_uri)
-    with open(aligned_path, 'w') as file:
-        file.write(aligned)
+    gecko_JSON = load_gecko_JSON(json_path)
+    write_atomically(aligned_path, gecko_JSON_to_aligned_lines(gecko_JSON, file_uri))
     print(f"succesfully dumped {aligned_path}")
 
 
+def parse_serie_split(serie_split):
+    """
+    Parameters:
+    -----------
+    serie_split : `str`
+        <test>,<dev> where <test> and <dev> are seasons number separated by '-'
+        e.g. : 1,2-3
+
+    Returns:
+    --------
+    serie_split : `dict`
+        e.g. {"test": [1], "dev": [2, 3]}
+    """
+    parsed = {}
+    for key, seasons in zip(["test", "dev"], serie_split.split(",")):
+        parsed[key] = list(map(int, seasons.split("-")))
+    return parsed
+
+
+def convert_file(ALIGNED_PATH, TRANSCRIPTS_PATH, file_uri):
+    """Same as write_id_aligned_file but raises ValueError if the xml couldn't be parsed"""
+    if not write_id_aligned_file(ALIGNED_PATH, TRANSCRIPTS_PATH, file_uri):
+        raise ValueError(f"couldn't parse {file_uri}.xml")
+
+
+def batch(series, plumcot_path, stages, serie_splits, n_workers=None,
+          expected_min_speech_time=0.0, vrbs_confidence_threshold=None,
+          forced_alignment_collar=0.0):
+    """
+    Runs the stages of every serie over a single process pool, without any prompt.
+    postprocess is split per file so that long series don't set the duration of the batch.
+
+    Parameters:
+    -----------
+    series : `list` of `str`
+        serie uris
+    plumcot_path : something like /path/to/pyannote-db-plumcot
+    stages : `list` of `str`
+        among BATCH_STAGES
+    serie_splits : `dict`
+        {serie_uri : serie_split as defined in parse_serie_split}
+    n_workers : `int`, Number of processes. Defaults to the number of CPUs
+    expected_min_speech_time, forced_alignment_collar : see gecko_JSONs_to_RTTM
+    vrbs_confidence_threshold : `float`, see gecko_JSONs_to_RTTM and gecko_JSONs_to_UEM
+        Defaults to 0.0 for postprocess and 0.5 for clean_UEM, as with the single-serie commands.
+
+    Returns:
+    --------
+    failed : `dict`
+        {serie_uri : [reasons of the failure]}
+
+    Raises:
+    -------
+    ValueError if a stage is not in BATCH_STAGES
+    """
+    unknown = [stage for stage in stages if stage not in BATCH_STAGES]
+    if unknown:
+        raise ValueError(f"unknown stages {', '.join(unknown)}, "
+                         f"expected some of {', '.join(BATCH_STAGES)}")
+    tasks, failed = [], {}
+    for serie_uri in series:
+        SERIE_PATH = os.path.join(plumcot_path, "Plumcot", "data", serie_uri)
+        transcripts_path = os.path.join(SERIE_PATH, "transcripts")
+        aligned_path = os.path.join(SERIE_PATH, "forced-alignment")
+        if 'preprocess' in stages:
+            tasks.append(task(f"{serie_uri}/preprocess", write_brackets, SERIE_PATH,
+                              transcripts_path, group=serie_uri))
+            os.makedirs(aligned_path, exist_ok=True)
+        json_tasks = []
+        if 'postprocess' in stages:
+            if not os.path.isdir(aligned_path):
+                failed.setdefault(serie_uri, []).append(f"{aligned_path} does not exist")
+                continue
+            for file_name in sorted(os.listdir(aligned_path)):
+                uri, extension = os.path.splitext(file_name)
+                if extension != ".xml":
+                    continue
+                json_task = task(f"{serie_uri}/json/{uri}", convert_file,
+                                 aligned_path, transcripts_path, uri, group=serie_uri)
+                tasks.append(json_task)
+                json_tasks.append(json_task["name"])
+                tasks.append(task(f"{serie_uri}/aligned/{uri}", gecko_JSON_to_aligned_file,
+                                  aligned_path, uri, deps=[json_task["name"]],
+                                  group=serie_uri))
+            if not json_tasks:
+                failed.setdefault(serie_uri, []).append(
+                    f"no xml files were found in {aligned_path}")
+                continue
+            if serie_uri in serie_splits:
+                confidence = vrbs_confidence_threshold if vrbs_confidence_threshold is not None else 0.0
+                annotation_path = os.path.join(
+                    aligned_path, f"{serie_uri}_{forced_alignment_collar}collar.rttm")
+                annotated_path = os.path.join(
+                    aligned_path, f"{serie_uri}_{confidence}confidence.uem")
+                stats_path = os.path.join(aligned_path, f"{serie_uri}.stats.tsv")
+                tasks.append(task(f"{serie_uri}/RTTM", gecko_JSONs_to_RTTM, aligned_path,
+                                  annotation_path, annotated_path, serie_splits[serie_uri],
+                                  confidence, forced_alignment_collar,
+                                  expected_min_speech_time, stats_path, SERIE_PATH,
+                                  deps=json_tasks, group=serie_uri))
+            else:
+                warnings.warn(f"no serie_split for {serie_uri}, skipping conversion to RTTM")
+        if 'clean_UEM' in stages:
+            confidence = vrbs_confidence_threshold if vrbs_confidence_threshold is not None else 0.5
+            annotated_path = os.path.join(aligned_path,
+                                          f"{serie_uri}_{confidence}confidence.SAD.uem")
+            tasks.append(task(f"{serie_uri}/clean_UEM", gecko_JSONs_to_UEM, aligned_path,
+                              annotated_path, confidence, deps=json_tasks,
+                              group=serie_uri))
+
+    status = run_tasks(tasks, n_workers)
+    for serie_uri, names in failures(tasks, status).items():
+        for name in names:
+            failed.setdefault(serie_uri, []).append(f"{name}: {status.get(name)}")
+    return failed
+
+
+def shard(SERIE_PATH, WAV_PATH, ALIGNED_PATH, TRANSCRIPTS_PATH, serie_split, LEASE_PATH,
+          aligner=DEFAULT_ALIGNER, worker_id=None, ttl=600.0, expected_min_speech_time=0.0,
+          vrbs_confidence_threshold=0.0, forced_alignment_collar=0.0, n_chunks=1, retry=False):
+    """
+    Aligns, converts to JSON and to aligned every file of SERIE_PATH/file_list.txt
+    along with any number of workers (possibly on other machines) sharing LEASE_PATH
+    (see fa.lease), then converts the serie to RTTM if every file is done.
+    This should be run after preprocess.
+
+    Parameters:
+    -----------
+    SERIE_PATH : something like /path/to/pyannote-db-plumcot/Plumcot/data/<serie_uri>
+    WAV_PATH : path where the <file_uri>.en16kHz.wav files are stored
+    ALIGNED_PATH, TRANSCRIPTS_PATH : see write_id_aligned
+    serie_split : as defined in parse_serie_split
+    LEASE_PATH : path to a directory shared by all workers
+    aligner : `str`, see fa.align.run_aligner
+    worker_id, ttl, retry : see fa.lease.run_shard
+    n_chunks : `int`, if more than 1, files are aligned using fa.align.align_chunked
+        Defaults to 1
+    expected_min_speech_time, vrbs_confidence_threshold, forced_alignment_collar :
+        see gecko_JSONs_to_RTTM
+
+    Returns:
+    --------
+    status : `dict`
+        {name : DONE, SKIPPED or the error message}
+    """
+    serie_uri = os.path.basename(os.path.normpath(SERIE_PATH))
+    with open(os.path.join(SERIE_PATH, "file_list.txt"), 'r') as file:
+        file_uris = [file_uri for file_uri in file.read().split("\n") if file_uri]
+    tasks = []
+    for file_uri in file_uris:
+        tasks.append(task(f"align.{file_uri}", align_chunked,
+                          os.path.join(WAV_PATH, f"{file_uri}.en16kHz.wav"),
+                          os.path.join(ALIGNED_PATH, f"{file_uri}.xml"),
+                          os.path.join(TRANSCRIPTS_PATH, f"{file_uri}.brackets"),
+                          aligner, n_chunks))
+        tasks.append(task(f"json.{file_uri}", convert_file, ALIGNED_PATH, TRANSCRIPTS_PATH,
+                          file_uri, deps=[f"align.{file_uri}"]))
+        tasks.append(task(f"aligned.{file_uri}", gecko_JSON_to_aligned_file, ALIGNED_PATH,
+                          file_uri, deps=[f"json.{file_uri}"]))
+    annotation_path = os.path.join(ALIGNED_PATH,
+                                   f"{serie_uri}_{forced_alignment_collar}collar.rttm")
+    annotated_path = os.path.join(ALIGNED_PATH,
+                                  f"{serie_uri}_{vrbs_confidence_threshold}confidence.uem")
+    stats_path = os.path.join(ALIGNED_PATH, f"{serie_uri}.stats.tsv")
+    merge = task("merge", gecko_JSONs_to_RTTM, ALIGNED_PATH, annotation_path,
+                 annotated_path, serie_split, vrbs_confidence_threshold,
+                 forced_alignment_collar, expected_min_speech_time, stats_path, SERIE_PATH)
+    return run_shard(LEASE_PATH, tasks, merge, worker_id, ttl, retry=retry)
+
+
 if __name__ == '__main__':
     args = docopt(__doc__)
     if args['split_regions']:
@@ -446,9 +697,44 @@ if __name__ == '__main__':
         json_path = Path(args['<json_path>'])
         file_uri = args['<file_uri>']
         write_RTTM(json_path, file_uri)
+    elif args['serve']:
+        service = ConversionService(args['<rttm_path>'], args['<uem_path>'],
+                                    args['--aligned_path'],
+                                    float(args['--delay']) if args['--delay'] else DEFAULT_DELAY)
+        serve(service, int(args['--port']) if args['--port'] else DEFAULT_PORT)
     elif args['gecko_to_aligned']:
         aligned_path = args['<aligned_path>']
         gecko_JSONs_to_aligned(aligned_path)
+    elif args['batch']:
+        with open(args['<series_path>'], 'r') as file:
+            series = [line.split(',')[0].strip() for line in file.read().split("\n")
+                      if line.strip()]
+        serie_splits = {}
+        if args['--splits']:
+            with open(args['--splits'], 'r') as file:
+                for line in file.read().split("\n"):
+                    if line.strip():
+                        serie_uri, serie_split = line.split()
+                        serie_splits[serie_uri] = parse_serie_split(serie_split)
+        stages = args['--stages'].split(",") if args['--stages'] else ['postprocess']
+        n_workers = int(args['--workers']) if args['--workers'] else None
+        expected_min_speech_time = float(args["--expected_time"]) if args[
+            "--expected_time"] else 0.0
+        vrbs_confidence_threshold = float(args["--conf_threshold"]) if args[
+            "--conf_threshold"] else None
+        forced_alignment_collar = float(args["--collar"]) if args["--collar"] else 0.0
+        try:
+            failed = batch(series, args['<plumcot_path>'], stages, serie_splits, n_workers,
+                           expected_min_speech_time, vrbs_confidence_threshold,
+                           forced_alignment_collar)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        for serie_uri, reasons in failed.items():
+            warnings.warn(f"{serie_uri} failed:\n" + "\n".join(reasons))
+        print(f"Done with {len(series) - len(failed)}/{len(series)} series without failure.")
+        if failed:
+            sys.exit(1)
     else:
         serie_uri = args["<serie_uri>"]
         plumcot_path = args["<plumcot_path>"]
@@ -457,7 +743,39 @@ if __name__ == '__main__':
             "--transcripts_path"] else os.path.join(SERIE_PATH, "transcripts")
         aligned_path = args["--aligned_path"] if args["--aligned_path"] else os.path.join(
             SERIE_PATH, "forced-alignment")
-        if args['check_files']:
+        if args['shard']:
+            wav_path = os.path.join(args['--wav_path'] if args['--wav_path']
+                                    else "/vol/work3/lefevre/dvd_extracted", serie_uri)
+            lease_path = args['--lease_dir'] if args['--lease_dir'] else os.path.join(
+                aligned_path, "leases")
+            status = shard(SERIE_PATH, wav_path, aligned_path, transcripts_path,
+                           parse_serie_split(args["<serie_split>"]), lease_path,
+                           args['--aligner'] if args['--aligner'] else DEFAULT_ALIGNER,
+                           args['--worker_id'],
+                           float(args['--ttl']) if args['--ttl'] else 600.0,
+                           float(args["--expected_time"]) if args["--expected_time"] else 0.0,
+                           float(args["--conf_threshold"]) if args["--conf_threshold"] else 0.0,
+                           float(args["--collar"]) if args["--collar"] else 0.0,
+                           int(args["--chunks"]) if args["--chunks"] else 1,
+                           args['--retry'])
+            failed = {name: error for name, error in status.items() if error != DONE}
+            for name, error in failed.items():
+                warnings.warn(f"{name} failed:\n{error}")
+            print(f"Done with {len(status) - len(failed)}/{len(status)} tasks without failure.")
+            if failed:
+                sys.exit(1)
+        elif args['align']:
+            file_uri = args['<file_uri>']
+            wav_path = os.path.join(args['--wav_path'] if args['--wav_path']
+                                    else "/vol/work3/lefevre/dvd_extracted", serie_uri)
+            xml_path = os.path.join(aligned_path, f"{file_uri}.xml")
+            align_chunked(os.path.join(wav_path, f"{file_uri}.en16kHz.wav"), xml_path,
+                          os.path.join(transcripts_path, f"{file_uri}.brackets"),
+                          args['--aligner'] if args['--aligner'] else DEFAULT_ALIGNER,
+                          int(args["--chunks"]) if args["--chunks"] else 1,
+                          int(args["--workers"]) if args["--workers"] else None)
+            print(f"succesfully aligned {xml_path}")
+        elif args['check_files']:
             wav_path = os.path.join(args['--wav_path'], serie_uri) if args[
                 '--wav_path'] else None
             check_files(SERIE_PATH, wav_path, aligned_path)
@@ -478,9 +796,7 @@ if __name__ == '__main__':
 
             gecko_JSONs_to_UEM(aligned_path, annotated_path, vrbs_confidence_threshold)
         elif args['postprocess']:
-            serie_split = {}
-            for key, set in zip(["test", "dev"], args["<serie_split>"].split(",")):
-                serie_split[key] = list(map(int, set.split("-")))
+            serie_split = parse_serie_split(args["<serie_split>"])
             expected_min_speech_time = float(args["--expected_time"]) if args[
                 "--expected_time"] else 0.0
             vrbs_confidence_threshold = float(args["--conf_threshold"]) if args[
@@ -492,6 +808,7 @@ if __name__ == '__main__':
             annotated_path = os.path.join(aligned_path,
                                           "{}_{}confidence.uem".format(serie_uri,
                                                                        vrbs_confidence_threshold))
+            stats_path = os.path.join(aligned_path, f"{serie_uri}.stats.tsv")
 
             print(
                 "converting vrbs.xml to vrbs.json and adding proper id to vrbs alignment")
@@ -500,7 +817,7 @@ if __name__ == '__main__':
                 gecko_JSONs_to_RTTM(aligned_path, annotation_path, annotated_path,
                                     serie_split,
                                     vrbs_confidence_threshold, forced_alignment_collar,
-                                    expected_min_speech_time)
+                                    expected_min_speech_time, stats_path, SERIE_PATH)
             else:
                 print("Okay, no hard feelings")
             if do_this(
@@ -0,0 +1,148 @@
+import sys
+import wave
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from fa.align import align_chunked, split_transcript, find_cuts
+
+FRAMERATE = 16000
+SILENCE = 0.5
+# seconds of speech per character of the transcript
+RATE = 0.05
+TURNS = [f"[speaker{i % 3}] " + " ".join(f"word{i}.{j}" for j in range(n)) + "\n"
+         for i, n in enumerate([12, 5, 20, 8, 15, 10])]
+
+# aligns the words of each line evenly between margin and the end of the audio minus margin
+STUB = '''
+import sys, wave
+wav_path, xml_path, transcript_path, margin = sys.argv[1:5]
+margin = float(margin)
+with wave.open(wav_path) as wav:
+    duration = wav.getnframes() / wav.getframerate()
+lines = [line.split() for line in open(transcript_path) if line.strip()]
+n_words = sum(len(line) for line in lines)
+step = (duration - 2 * margin) / n_words
+out = ["<AudioDoc>", "<ProcList/>", "<ChannelList/>", "<SpeakerList>"]
+out += [f'<Speaker spkid="MS{i}"/>' for i in range(len(lines))]
+out += ["</SpeakerList>", "<SegmentList>"]
+t = margin
+for i, line in enumerate(lines):
+    out.append(f'<SpeechSegment stime="{t:.3f}" etime="{t + step * len(line):.3f}" spkid="MS{i}">')
+    for word in line:
+        out.append(f'<Word stime="{t:.3f}" dur="{step * 0.9:.3f}" conf="0.9"> {word} </Word>')
+        t += step
+    out.append("</SpeechSegment>")
+out += ["</SegmentList>", "</AudioDoc>"]
+open(xml_path, "w").write("\\n".join(out))
+'''
+
+
+def write_wav(wav_path, rate=RATE, credits=0.0):
+    """
+    Writes a wav where each turn is noise lasting rate seconds per character, preceded by a silence,
+    after credits seconds of quieter noise which are not in the transcript
+
+    Returns:
+    --------
+    turn_starts : `np.ndarray`
+        start of the silence before each turn, in seconds
+    """
+    rng = np.random.default_rng(0)
+    samples = [rng.normal(0, 500, int(credits * FRAMERATE))]
+    for turn in TURNS:
+        samples.append(np.zeros(int(SILENCE * FRAMERATE)))
+        samples.append(rng.normal(0, 3000, int(len(turn) * rate * FRAMERATE)))
+    samples.append(np.zeros(int(SILENCE * FRAMERATE)))
+    with wave.open(str(wav_path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(FRAMERATE)
+        wav.writeframes(np.concatenate(samples).astype(np.int16).tobytes())
+    return np.cumsum([credits] + [SILENCE + len(turn) * rate for turn in TURNS[:-1]])
+
+
+def assert_cuts_before_turns(wav_path, n_chunks, turn_starts):
+    """Checks that each chunk is cut in the silence before its first turn"""
+    chunks, positions = split_transcript("".join(TURNS), n_chunks)
+    cuts = find_cuts(wav_path, positions)
+    first_turns = np.cumsum([0] + [chunk.count("\n") for chunk in chunks[:-1]])
+    for cut, turn in zip(cuts[1:-1], first_turns[1:]):
+        assert turn_starts[turn] < cut / FRAMERATE < turn_starts[turn] + SILENCE
+    return chunks, cuts
+
+
+@pytest.fixture
+def files(tmp_path):
+    """Writes a wav, its transcript and the stub aligner"""
+    wav_path = tmp_path / "file.en16kHz.wav"
+    turn_starts = write_wav(wav_path)
+    transcript_path = tmp_path / "file.brackets"
+    transcript_path.write_text("".join(TURNS))
+    stub_path = tmp_path / "stub.py"
+    stub_path.write_text(STUB)
+    return wav_path, tmp_path / "file.xml", transcript_path, stub_path, turn_starts
+
+
+def words(xml_path):
+    return [(word.text.strip(), float(word.attrib["stime"]))
+            for speech_segment in ET.parse(xml_path).getroot()[3] for word in speech_segment]
+
+
+def test_chunks_are_stitched_in_order(files):
+    wav_path, xml_path, transcript_path, stub_path, turn_starts = files
+    aligner = f"{sys.executable} {stub_path} {{wav}} {{xml}} {{transcript}} 0.1"
+    align_chunked(wav_path, xml_path, transcript_path, aligner, n_chunks=3)
+
+    aligned = words(xml_path)
+    assert [text for text, _ in aligned] == "".join(TURNS).split()
+    # speaker turns keep the order of the transcript
+    speakers = [text for text, _ in aligned if text.startswith("[")]
+    assert speakers == [turn.split()[0] for turn in TURNS]
+    times = [stime for _, stime in aligned]
+    assert times == sorted(times)
+
+    # the words of each chunk are shifted by the start of the chunk
+    chunks, cuts = assert_cuts_before_turns(wav_path, 3, turn_starts)
+    assert len(chunks) == 3
+    i = 0
+    for chunk, cut in zip(chunks, cuts[:-1]):
+        assert aligned[i][1] == pytest.approx(cut / FRAMERATE + 0.1, abs=1e-3)
+        i += len(chunk.split())
+
+    # the speakers of different chunks don't share a spkid
+    root = ET.parse(xml_path).getroot()
+    expected = [f"{i}_MS{j}" for i, chunk in enumerate(chunks) for j in range(chunk.count("\n"))]
+    assert [speaker.attrib["spkid"] for speaker in root[2]] == expected
+    assert [speech_segment.attrib["spkid"] for speech_segment in root[3]] == expected
+
+
+def test_single_chunk_by_default(files):
+    wav_path, xml_path, transcript_path, stub_path, _ = files
+    aligner = f"{sys.executable} {stub_path} {{wav}} {{xml}} {{transcript}} 0.0"
+    align_chunked(wav_path, xml_path, transcript_path, aligner)
+    root = ET.parse(xml_path).getroot()
+    assert [speaker.attrib["spkid"] for speaker in root[2]] == [f"MS{i}" for i in range(len(TURNS))]
+
+
+def test_suspicious_cuts_fall_back_to_whole_file(files):
+    wav_path, xml_path, transcript_path, stub_path, _ = files
+    # words are aligned right against the cuts
+    aligner = f"{sys.executable} {stub_path} {{wav}} {{xml}} {{transcript}} 0.0"
+    with pytest.warns(UserWarning, match="aligning it as a whole"):
+        align_chunked(wav_path, xml_path, transcript_path, aligner, n_chunks=3)
+
+    aligned = words(xml_path)
+    assert [text for text, _ in aligned] == "".join(TURNS).split()
+    # aligned in one go: the words are evenly spaced over the whole file
+    steps = np.diff([stime for _, stime in aligned])
+    assert steps == pytest.approx(np.full(len(steps), steps[0]), abs=2e-3)
+
+
+@pytest.mark.parametrize("n_chunks", [2, 3, 4])
+def test_cuts_after_credits(tmp_path, n_chunks):
+    """Credits shift the turns by more than 5 seconds, but less than 5% of the file duration"""
+    wav_path = tmp_path / "file.en16kHz.wav"
+    turn_starts = write_wav(wav_path, rate=0.5, credits=15.0)
+    assert_cuts_before_turns(wav_path, n_chunks, turn_starts)
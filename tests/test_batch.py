@@ -0,0 +1,52 @@
+import pytest
+
+from fa.batch import task, run_tasks, failures, DONE, SKIPPED
+
+
+def square(x):
+    return x * x
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def test_failures_skip_dependents_and_are_grouped():
+    tasks = [
+        task("S1/json/1", square, 1, group="S1"),
+        task("S1/aligned/1", square, 1, deps=["S1/json/1"], group="S1"),
+        task("S1/RTTM", square, 1, deps=["S1/json/1"], group="S1"),
+        task("S2/json/1", fail, "couldn't parse", group="S2"),
+        task("S2/json/2", square, 2, group="S2"),
+        task("S2/aligned/1", square, 1, deps=["S2/json/1"], group="S2"),
+        task("S2/aligned/2", square, 2, deps=["S2/json/2"], group="S2"),
+        # skipped transitively
+        task("S2/RTTM", square, 1, deps=["S2/json/2", "S2/aligned/1"], group="S2"),
+        task("S2/stats", square, 1, deps=["S2/RTTM"], group="S2"),
+    ]
+    status = run_tasks(tasks, n_workers=2)
+
+    assert isinstance(status["S2/json/1"], ValueError)
+    assert str(status["S2/json/1"]) == "couldn't parse"
+    for name in ["S2/aligned/1", "S2/RTTM", "S2/stats"]:
+        assert status[name] == SKIPPED
+    for name in ["S1/json/1", "S1/aligned/1", "S1/RTTM", "S2/json/2", "S2/aligned/2"]:
+        assert status[name] == DONE
+
+    assert failures(tasks, status) == {
+        "S2": ["S2/json/1", "S2/aligned/1", "S2/RTTM", "S2/stats"]
+    }
+
+
+def test_group_defaults_to_name():
+    tasks = [task("a", fail, "a"), task("b", square, 1)]
+    assert failures(tasks, run_tasks(tasks, n_workers=1)) == {"a": ["a"]}
+
+
+@pytest.mark.parametrize("tasks", [
+    [task("a", square, 1), task("a", square, 2)],
+    [task("a", square, 1, deps=["b"])],
+])
+def test_invalid_tasks(tasks):
+    with pytest.raises(ValueError):
+        run_tasks(tasks)
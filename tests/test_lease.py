@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from fa.batch import task, DONE, SKIPPED
+from fa.lease import run_shard, status
+
+# fork so that the workers share the tasks defined in the tests
+context = multiprocessing.get_context("fork")
+
+
+def log_run(log_dir, name, duration=0.0):
+    """Task which records which process ran it"""
+    with open(os.path.join(log_dir, name), 'a') as file:
+        file.write(f"{os.getpid()}\n")
+    time.sleep(duration)
+
+
+def fail():
+    raise ValueError("failed on purpose")
+
+
+def runs(log_dir, name):
+    try:
+        with open(os.path.join(log_dir, name), 'r') as file:
+            return file.read().split()
+    except FileNotFoundError:
+        return []
+
+
+def make_tasks(log_dir, n_files, duration=0.0):
+    tasks = []
+    for i in range(n_files):
+        tasks.append(task(f"align.{i}", log_run, log_dir, f"align.{i}", duration))
+        tasks.append(task(f"json.{i}", log_run, log_dir, f"json.{i}", deps=[f"align.{i}"]))
+    return tasks, task("merge", log_run, log_dir, "merge")
+
+
+def test_workers_run_each_task_once(tmp_path):
+    lease_dir, log_dir = tmp_path / "leases", tmp_path / "logs"
+    log_dir.mkdir()
+    tasks, merge = make_tasks(log_dir, 12, duration=0.05)
+    workers = [context.Process(target=run_shard,
+                               args=(lease_dir, tasks, merge, f"worker{i}", 60.0, 0.05))
+               for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    for t in tasks + [merge]:
+        assert len(runs(log_dir, t["name"])) == 1, t["name"]
+        assert status(lease_dir, t["name"]) == DONE
+    # several workers took part
+    assert len({pid for t in tasks for pid in runs(log_dir, t["name"])}) > 1
+    # merge ran after every task
+    merge_time = os.stat(log_dir / "merge").st_mtime
+    assert all(os.stat(log_dir / t["name"]).st_mtime <= merge_time for t in tasks)
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    lease_dir, log_dir = tmp_path / "leases", tmp_path / "logs"
+    log_dir.mkdir()
+    ttl = 1.0
+    tasks = [task("align.0", log_run, log_dir, "align.0", 3600.0)]
+    killed = context.Process(target=run_shard, args=(lease_dir, tasks, None, "killed", ttl, 0.05))
+    killed.start()
+    while not runs(log_dir, "align.0"):
+        time.sleep(0.05)
+    os.kill(killed.pid, signal.SIGKILL)
+    killed.join()
+    assert status(lease_dir, "align.0") is None
+
+    tasks = [task("align.0", log_run, log_dir, "align.0")]
+    start = time.time()
+    with pytest.warns(UserWarning, match="reclaiming expired lease"):
+        result = run_shard(lease_dir, tasks, worker_id="survivor", ttl=ttl, poll=0.05)
+    assert result == {"align.0": DONE}
+    assert time.time() - start >= ttl / 2
+    assert runs(log_dir, "align.0") == [str(killed.pid), str(os.getpid())]
+
+
+def test_failures_skip_merge_until_retry(tmp_path):
+    lease_dir, log_dir = tmp_path / "leases", tmp_path / "logs"
+    log_dir.mkdir()
+    tasks, merge = make_tasks(log_dir, 2)
+    tasks[0] = task("align.0", fail)
+    result = run_shard(lease_dir, tasks, merge, poll=0.05)
+    assert "failed on purpose" in result["align.0"]
+    assert result["json.0"] == SKIPPED
+    assert result["json.1"] == DONE
+    assert result["merge"] == SKIPPED
+    assert not runs(log_dir, "merge")
+
+    # failures are permanent without retry
+    tasks[0] = task("align.0", log_run, log_dir, "align.0")
+    assert run_shard(lease_dir, tasks, merge, poll=0.05) == result
+
+    result = run_shard(lease_dir, tasks, merge, poll=0.05, retry=True)
+    assert all(value == DONE for value in result.values())
+    assert [len(runs(log_dir, t["name"])) for t in tasks + [merge]] == [1] * 5
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from pyannote.core import Annotation, Segment
+from pyannote.database.util import load_rttm
+
+from fa.load import load_aligned, load_rttm_arrays
+
+# ep1 and ep10 share a prefix, ep2 is split in two blocks
+ALIGNED = [
+    ("ep10", "rachel", 0.0, 0.5, "Hi", 0.9),
+    ("ep1", "ross", 0.1, 0.4, "Hello", 0.8),
+    ("ep1", "ross", 0.5, 0.9, "there", 0.7),
+    ("ep2", "joey", 1.0, 1.5, "How", 0.6),
+    ("ep1", "monica", 2.0, 2.5, "you", 0.5),
+    ("ep2", "joey", 3.0, 3.5, "doin'", 0.4),
+    ("ep10", "rachel", 4.0, 4.5, "Bye", 0.3),
+]
+
+
+def write_aligned(path, rows):
+    with open(path, 'w') as file:
+        for row in rows:
+            file.write("{} {} {:.3f} {:.3f} {} {:.3f}\n".format(*row))
+    return path
+
+
+def as_rows(aligned):
+    return [(aligned["uris"][uri], aligned["speakers"][speaker], start, end, token, confidence)
+            for uri, speaker, start, end, token, confidence in zip(
+                aligned["uri"], aligned["speaker"], aligned["start"], aligned["end"],
+                aligned["token"], aligned["confidence"])]
+
+
+def assert_equal(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        np.testing.assert_array_equal(a[key], b[key])
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+@pytest.mark.parametrize("uris", [None, ["ep1"], ["ep10"], ["ep2"], ["ep2", "ep1", "ep2"],
+                                  ["ep3"], []])
+def test_load_aligned(tmp_path, memory_map, uris):
+    path = write_aligned(tmp_path / "serie.aligned", ALIGNED)
+    aligned = load_aligned(path, uris, memory_map)
+    expected = [row for row in ALIGNED if uris is None or row[0] in uris]
+    # each uri is loaded as a block
+    if uris is not None:
+        expected.sort(key=lambda row: list(dict.fromkeys(uris)).index(row[0]))
+    assert as_rows(aligned) == expected
+    assert aligned["uris"] == sorted({row[0] for row in expected})
+    assert_equal(aligned, load_aligned(path, uris, not memory_map))
+
+
+def test_tokens_with_spaces(tmp_path):
+    path = tmp_path / "serie.aligned"
+    path.write_text("ep1 ross 0.1 0.4 Hello there 0.8\n\nep1 ross 0.5 0.9 you 0.7\n")
+    aligned = load_aligned(path)
+    assert aligned["token"].tolist() == ["Hello there", "you"]
+    assert aligned["confidence"].tolist() == [0.8, 0.7]
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_empty_files(tmp_path, memory_map):
+    path = tmp_path / "empty"
+    path.write_text("")
+    aligned = load_aligned(path, memory_map=memory_map)
+    assert aligned["uris"] == [] and len(aligned["start"]) == 0 and len(aligned["token"]) == 0
+    rttm = load_rttm_arrays(path, memory_map=memory_map)
+    assert rttm["uris"] == [] and len(rttm["end"]) == 0
+
+
+@pytest.mark.parametrize("content", [
+    "ep1 ross 0.1 0.4 0.8\n",
+    "ep1 ross 0.1 0.4 Hello 0.8\nep1 ross 0.5\n",
+    "ep1 ross start 0.4 Hello 0.8\n",
+    "ep1 ross 0.1 0.4 Hello there\nep1 ross 0.5 0.9 0.7\n",
+])
+def test_malformed_aligned(tmp_path, content):
+    path = tmp_path / "serie.aligned"
+    path.write_text(content)
+    with pytest.raises(ValueError, match="not a valid aligned file"):
+        load_aligned(path)
+
+
+def test_malformed_rttm(tmp_path):
+    path = tmp_path / "serie.rttm"
+    path.write_text("SPEAKER ep1 1 0.1\n")
+    with pytest.raises(ValueError, match="not a valid RTTM file"):
+        load_rttm_arrays(path)
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+@pytest.mark.parametrize("uris", [None, ["ep1"], ["ep10", "ep2"]])
+def test_load_rttm_arrays(tmp_path, memory_map, uris):
+    path = tmp_path / "serie.rttm"
+    with open(path, 'w') as file:
+        for uri in ["ep10", "ep1", "ep2"]:
+            annotation = Annotation(uri)
+            for uri_, speaker, start, end, _, _ in ALIGNED:
+                if uri_ == uri:
+                    annotation[Segment(start, end)] = speaker
+            annotation.write_rttm(file)
+    rttm = load_rttm_arrays(path, uris, memory_map)
+    expected = {uri: annotation for uri, annotation in load_rttm(path).items()
+                if uris is None or uri in uris}
+    assert rttm["uris"] == sorted(expected)
+    segments = sorted((rttm["uris"][uri], rttm["speakers"][speaker], start, end)
+                      for uri, speaker, start, end in zip(
+                          rttm["uri"], rttm["speaker"], rttm["start"], rttm["end"]))
+    expected = sorted((uri, label, segment.start, segment.end)
+                      for uri, annotation in expected.items()
+                      for segment, _, label in annotation.itertracks(yield_label=True))
+    assert [segment[:2] for segment in segments] == [segment[:2] for segment in expected]
+    np.testing.assert_allclose([segment[2:] for segment in segments],
+                               [segment[2:] for segment in expected], atol=1e-3)
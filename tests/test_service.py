@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from pyannote.core import Annotation, Segment, Timeline
+
+import fa.service
+from fa.service import ConversionService, _check_uri
+
+URIS = ["ep1", "ep10", "ep2"]
+
+
+def gecko_JSON(speaker, start, end):
+    return {"monologues": [{
+        "speaker": {"id": speaker}, "start": start, "end": end,
+        "terms": [{"start": start, "end": end, "text": "word", "confidence": 0.9}]
+    }]}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    rttm_path, uem_path = tmp_path / "serie.rttm", tmp_path / "serie.uem"
+    with open(rttm_path, 'w') as rttm, open(uem_path, 'w') as uem:
+        for i, uri in enumerate(URIS):
+            annotation = Annotation(uri)
+            annotation[Segment(0, 1 + i)] = "rachel"
+            annotation[Segment(2 + i, 3 + i)] = "ross"
+            annotation.write_rttm(rttm)
+            Timeline([Segment(0, 3 + i)], uri=uri).write_uem(uem)
+    return rttm_path, uem_path
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Records the paths written by the service"""
+    written = []
+    write_atomically = fa.service.write_atomically
+
+    def record(path, lines):
+        written.append(str(path))
+        write_atomically(path, lines)
+
+    monkeypatch.setattr(fa.service, "write_atomically", record)
+    return written
+
+
+def blocks(path, field):
+    """{uri : lines of uri}"""
+    return fa.service._group_lines(path, field)
+
+
+def test_updates_are_coalesced(paths, writes):
+    rttm_path, uem_path = paths
+    before = blocks(rttm_path, 1), blocks(uem_path, 0)
+    service = ConversionService(rttm_path, uem_path, delay=0.5)
+    service.update_RTTM(gecko_JSON("monica", 0.0, 1.0), "ep1")
+    service.update_RTTM(gecko_JSON("joey", 0.5, 2.0), "ep1")
+    assert writes == []
+    time.sleep(1.5)
+    assert sorted(writes) == sorted([str(rttm_path), str(uem_path)])
+
+    rttm, uem = blocks(rttm_path, 1), blocks(uem_path, 0)
+    assert list(rttm) == URIS
+    assert "joey" in rttm["ep1"] and "monica" not in rttm["ep1"]
+    assert uem["ep1"].split()[2:] == ["0.000", "2.000"]
+    # the other files are untouched
+    for uri in ["ep10", "ep2"]:
+        assert rttm[uri] == before[0][uri]
+        assert uem[uri] == before[1][uri]
+    assert service.flush() == []
+
+
+def test_flush_writes_right_away(paths, writes):
+    rttm_path, uem_path = paths
+    service = ConversionService(rttm_path, uem_path, delay=60.0)
+    assert service.update_aligned(gecko_JSON("monica", 0.0, 1.0), "ep2") == \
+           [str(rttm_path.parent / "ep2.aligned")]
+    assert service.flush() == [str(rttm_path.parent / "ep2.aligned")]
+    assert (rttm_path.parent / "ep2.aligned").read_text() == \
+           "ep2 monica 0.00 1.00 word 0.90\n"
+
+
+def test_failed_writes_are_retried(paths, tmp_path):
+    rttm_path, uem_path = paths
+    service = ConversionService(rttm_path, uem_path, tmp_path / "missing", delay=0.1)
+    service.update_aligned(gecko_JSON("monica", 0.0, 1.0), "ep2")
+    time.sleep(0.5)
+    assert service.flusher.is_alive()
+    (tmp_path / "missing").mkdir()
+    time.sleep(0.5)
+    assert (tmp_path / "missing" / "ep2.aligned").exists()
+    assert not service.dirty
+
+
+@pytest.mark.parametrize("file_uri", ["../x", "a/b", "..", "", "../../escape"])
+def test_invalid_uris(paths, file_uri):
+    with pytest.raises(ValueError):
+        _check_uri(file_uri)
+    service = ConversionService(*paths)
+    with pytest.raises(ValueError):
+        service.update_aligned(gecko_JSON("monica", 0.0, 1.0), file_uri)
+
+
+def test_unknown_uri(paths):
+    service = ConversionService(*paths)
+    with pytest.raises(ValueError, match="is not in"):
+        service.update_RTTM(gecko_JSON("monica", 0.0, 1.0), "ep3")
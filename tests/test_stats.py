@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from fa.convert import gecko_JSON_to_Annotation
+from fa.stats import collect_terms, alignment_stats, EPISODE
+
+
+def make_gecko_JSON(seed):
+    """
+    Random monologues with overlaps and gaps between terms,
+    the gaps are never equal to the collars used in the tests
+    """
+    rng = random.Random(seed)
+    monologues, t = [], 0.
+    for _ in range(rng.randint(1, 8)):
+        terms = []
+        for _ in range(rng.randint(1, 5)):
+            t = max(t + rng.choice([0., 0.05, 0.1, 0.3, -0.2, 0.17]), 0.)
+            duration = rng.uniform(0.05, 0.5)
+            terms.append({"start": t, "end": t + duration, "text": "word",
+                          "confidence": rng.random()})
+            t += duration
+        monologues.append({"speaker": {"id": rng.choice(["a", "b", "a@b", "#unknown#c"])},
+                           "terms": terms})
+    return {"monologues": monologues}
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("collar", [0., 0.12, 0.27])
+@pytest.mark.parametrize("confidence_threshold", [0., 0.5])
+def test_alignment_stats_match_pyannote(seed, collar, confidence_threshold):
+    gecko_JSON = make_gecko_JSON(seed)
+    wrapped, columns = collect_terms(gecko_JSON)
+    annotation, annotated = gecko_JSON_to_Annotation(wrapped, "uri", 'speaker',
+                                                     confidence_threshold, collar)
+    rows = alignment_stats(columns, "uri", annotated, collar=collar)
+    overlap = annotation.get_overlap()
+    annotated_time = annotated.support().duration()
+
+    episode = rows[0]
+    assert episode["speaker"] == EPISODE
+    timeline = annotation.get_timeline()
+    assert episode["speech_time"] == pytest.approx(timeline.duration())
+    assert episode["annotated_time"] == pytest.approx(annotated_time)
+    assert episode["annotated_speech_time"] == pytest.approx(
+        timeline.crop(annotated).support().duration())
+    assert episode["overlap_time"] == pytest.approx(overlap.duration())
+
+    terms = [(monologue["speaker"]["id"], term) for monologue in gecko_JSON["monologues"]
+             for term in monologue["terms"]]
+    assert episode["n_terms"] == len(terms)
+    assert episode["low_confidence"] == pytest.approx(
+        sum(term["confidence"] <= 0.5 for _, term in terms) / len(terms))
+
+    assert sorted(row["speaker"] for row in rows[1:]) == sorted(annotation.labels())
+    for row in rows[1:]:
+        timeline = annotation.label_timeline(row["speaker"])
+        assert row["speech_time"] == pytest.approx(timeline.duration())
+        assert row["annotated_speech_time"] == pytest.approx(
+            timeline.crop(annotated).support().duration())
+        assert row["overlap_time"] == pytest.approx(timeline.crop(overlap).duration())
+        n_terms = sum(row["speaker"] in speaker_id.split("@") for speaker_id, _ in terms)
+        assert row["n_terms"] == n_terms
+
+
+def test_empty_gecko_JSON():
+    wrapped, columns = collect_terms({"monologues": []})
+    list(wrapped["monologues"])
+    rows = alignment_stats(columns, "uri")
+    assert len(rows) == 1
+    assert rows[0]["n_terms"] == 0
+    assert rows[0]["speech_time"] == 0.
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from fa.convert import gecko_JSON_to_aligned, gecko_JSON_to_UEM, gecko_JSON_to_Annotation
+from fa.stream import iter_monologues, iter_terms, load_gecko_JSON
+
+GECKO_JSON = {
+    "schemaVersion": "2.0",
+    "monologues": [
+        {
+            "speaker": {"id": "rachel_green", "name": None, "vrbs_id": "MS1"},
+            "start": 0.0, "end": 1.2,
+            "terms": [
+                {"start": 0.0, "end": 0.5, "text": "Oh,", "type": "WORD", "confidence": 0.9},
+                {"start": 0.6, "end": 1.2, "text": "\"hi\" \u00e9t\u00e9 \\o/",
+                 "type": "WORD", "confidence": 0.3}
+            ]
+        },
+        {},
+        {
+            "speaker": {"id": "ross_geller@monica_geller", "name": None, "vrbs_id": "MS2"},
+            "start": 1.3, "end": 3.0,
+            "terms": [
+                {"start": 1.3, "end": 2.1, "text": "Hey", "type": "WORD", "confidence": 0.7},
+                {"start": 2.5, "end": 3.0, "text": "{[,]}", "type": "WORD", "confidence": 1e-3}
+            ]
+        },
+        {
+            "speaker": {"id": "#unknown#1", "name": None, "vrbs_id": "MS3"},
+            "start": 3.5, "end": 4.0,
+            "terms": [{"start": 3.5, "end": 4.0, "text": "what", "type": "WORD",
+                       "confidence": 0.6}]
+        }
+    ],
+    "extra": {"list": [1, 2.5, -3e2, True, None], "text": "monologues"}
+}
+
+
+@pytest.fixture(params=[None, 2], ids=["compact", "indented"])
+def json_path(tmp_path, request):
+    path = tmp_path / "file.json"
+    with open(path, 'w') as file:
+        json.dump(GECKO_JSON, file, indent=request.param, ensure_ascii=False)
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 16])
+def test_iter_monologues(json_path, chunk_size):
+    with open(json_path, 'r') as file:
+        expected = json.load(file)["monologues"]
+    assert list(iter_monologues(json_path, chunk_size)) == expected
+
+
+@pytest.mark.parametrize("content", ['{}', '{"monologues": []}', ' { "monologues" : [ ] } ',
+                                     '{"schemaVersion": "2.0", "monologues": []}'])
+@pytest.mark.parametrize("chunk_size", [1, 3])
+def test_no_monologues(tmp_path, content, chunk_size):
+    path = tmp_path / "file.json"
+    path.write_text(content)
+    assert list(iter_monologues(path, chunk_size)) == []
+
+
+def test_iter_terms(json_path):
+    terms = list(iter_terms(json_path, 5))
+    assert [term["text"] for _, term in terms] == [
+        term["text"] for monologue in GECKO_JSON["monologues"] if monologue
+        for term in monologue["terms"]]
+    assert terms[2][0]["id"] == "ross_geller@monica_geller"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_truncated_file_raises(json_path, chunk_size):
+    content = json_path.read_text()
+    for end in [1, len(content) // 3, len(content) // 2, len(content) - 1]:
+        json_path.write_text(content[:end])
+        with pytest.raises(ValueError):
+            list(iter_monologues(json_path, chunk_size))
+
+
+def load(json_path):
+    with open(json_path, 'r') as file:
+        return json.load(file)
+
+
+def test_gecko_JSON_to_aligned(json_path):
+    assert gecko_JSON_to_aligned(load_gecko_JSON(json_path, 3), "uri") == \
+           gecko_JSON_to_aligned(load(json_path), "uri")
+
+
+@pytest.mark.parametrize("confidence_threshold", [0.0, 0.5])
+@pytest.mark.parametrize("collar", [0.0, 0.5])
+def test_gecko_JSON_to_UEM(json_path, confidence_threshold, collar):
+    streamed = gecko_JSON_to_UEM(load_gecko_JSON(json_path, 3), "uri", 'speaker',
+                                 confidence_threshold, collar)
+    loaded = gecko_JSON_to_UEM(load(json_path), "uri", 'speaker', confidence_threshold, collar)
+    assert streamed == loaded
+
+
+@pytest.mark.parametrize("manual", [False, True])
+@pytest.mark.parametrize("confidence_threshold", [0.0, 0.5])
+def test_gecko_JSON_to_Annotation(json_path, manual, confidence_threshold):
+    streamed = gecko_JSON_to_Annotation(load_gecko_JSON(json_path, 3), "uri", 'speaker',
+                                        confidence_threshold, 0.5, manual=manual)
+    loaded = gecko_JSON_to_Annotation(load(json_path), "uri", 'speaker',
+                                      confidence_threshold, 0.5, manual=manual)
+    assert streamed == loaded
+    annotation, annotated = streamed
+    assert annotation.labels() == ["#unknown#1", "monica_geller", "rachel_green", "ross_geller"]